@@ -0,0 +1,66 @@
+# batch.py
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import itertools
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from maze_library import MazeLibrary
+from simulation import PelletCollectorPolicy, Simulation
+from utils import Constants
+
+DEFAULT_MAX_TICKS = 30 * 60 * Constants.FPS
+
+@lru_cache(maxsize=None)
+def open_library(path):
+    # one mapping per worker process, shared by every game it plays
+    return MazeLibrary(path)
+
+def run_game(seed, menu_params, max_ticks=DEFAULT_MAX_TICKS, library_path=None):
+    """play one headless game with the scripted policy and summarize the outcome"""
+    sim = Simulation(menu_params, maze_library=open_library(library_path) if library_path else None, seed=seed)
+    started = time.perf_counter()
+    ticks = sim.run(max_ticks, PelletCollectorPolicy())
+    elapsed = time.perf_counter() - started
+    game = sim.game
+    return {'seed': seed, 'menu_params': menu_params, 'ticks': ticks,
+            'waves_survived': game.wave_number - 1, 'score': game.score,
+            'base_health': game.base_health, 'towers_built': len(game.towers),
+            'ticks_per_second': ticks / elapsed if elapsed > 0 else 0.0}
+
+def run_batch(jobs, max_workers=None, max_ticks=DEFAULT_MAX_TICKS, library_path=None):
+    """run (seed, menu_params) jobs across one process per core, yielding results as games finish"""
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = [executor.submit(run_game, seed, menu_params, max_ticks, library_path) for seed, menu_params in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+def sweep_jobs(seeds, widths, heights, spawns, waves, enemies):
+    for seed, width, height, num_spawns, num_waves, num_enemies in itertools.product(seeds, widths, heights, spawns, waves, enemies):
+        yield seed, {'width': width, 'height': height, 'spawns': num_spawns, 'waves': num_waves, 'enemies': num_enemies}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a sweep of headless Maze Defender games, one JSON line per game")
+    parser.add_argument('--games', type=int, default=100, help="number of seeds per parameter combination")
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--width', type=int, nargs='+', default=[20])
+    parser.add_argument('--height', type=int, nargs='+', default=[15])
+    parser.add_argument('--spawns', type=int, nargs='+', default=[2])
+    parser.add_argument('--waves', type=int, nargs='+', default=[5])
+    parser.add_argument('--enemies', type=int, nargs='+', default=[10])
+    parser.add_argument('--max-ticks', type=int, default=DEFAULT_MAX_TICKS)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--library', help="maze library file (see maze_library.py) to draw mazes from")
+    args = parser.parse_args()
+
+    seeds = range(args.first_seed, args.first_seed + args.games)
+    jobs = sweep_jobs(seeds, args.width, args.height, args.spawns, args.waves, args.enemies)
+    for result in run_batch(jobs, args.workers, args.max_ticks, args.library):
+        print(json.dumps(result), flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# benchmark.py
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import pygame
+from enemy import Enemy
+from entity_store import HAS_NUMPY
+from main import Game
+from maze import Maze
+from simulation import KeyState
+from tower import Projectile, Tower
+from utils import Constants, a_star
+
+BENCHMARKS = {}  # name -> (setup, calls per timed run or None for --number); setup returns the callable that is timed
+PHASE_TIMINGS = {}  # benchmark name -> Maze.timings of each run
+
+def benchmark(name, number=None):
+    def register(setup):
+        BENCHMARKS[name] = (setup, number)
+        return setup
+    return register
+
+def measure(setup, repeat, number):
+    """seconds per call of the callable from setup(), one fresh setup per repeat"""
+    samples = []
+    for _ in range(repeat):
+        func = setup()
+        gc.collect()
+        gc.disable()  # as timeit does, so a collection triggered by setup garbage is not billed to func
+        try:
+            started = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter() - started) / number)
+        finally:
+            gc.enable()
+    return samples
+
+def started_game(width=20, height=15, vectorized=False, screen=None, seed=1):
+    game = Game(screen, vectorized=vectorized, seed=seed)
+    game.set_menu_params({'width': width, 'height': height, 'waves': 0})
+    game.start_game()
+    return game
+
+def add_crowd(game, count, rng):
+    """count enemies scattered over random tiles of the maze"""
+    maze = game.maze
+    for _ in range(count):
+        game.add_enemy(Enemy((rng.randrange(maze.width), rng.randrange(maze.height)), 'shortest', maze, 5, rng))
+    game.enemy_index.rebuild(game.enemies)
+
+
+for size in (20, 100, 400):
+    @benchmark(f'a_star/{size}x{size}', number=1 if size >= 400 else None)
+    def a_star_setup(size=size):
+        maze = Maze(size, size, 2, seed=size)
+        rng = random.Random(size)
+        pairs = [((rng.randrange(size), rng.randrange(size)), (rng.randrange(size), rng.randrange(size)))
+                 for _ in range(16)]
+        return lambda: [a_star(start, goal, maze) for start, goal in pairs]
+
+    @benchmark(f'corridor_path/{size}x{size}', number=1 if size >= 400 else None)
+    def corridor_path_setup(size=size):
+        maze = Maze(size, size, 2, seed=size)
+        rng = random.Random(size)
+        pairs = [((rng.randrange(size), rng.randrange(size)), (rng.randrange(size), rng.randrange(size)))
+                 for _ in range(16)]
+        # a fresh graph search per pair, expanded to cells as an enemy would walk it
+        return lambda: [list(maze.corridor_graph.find_path(start, goal)) for start, goal in pairs]
+
+for size in (100, 400):
+    @benchmark(f'maze_init/{size}x{size}', number=1)
+    def maze_init_setup(size=size):
+        def build():
+            maze = Maze(size, size, 2, seed=size)
+            maze.flow_field  # built lazily, so force it to be timed with the rest
+            PHASE_TIMINGS.setdefault(f'maze_init/{size}x{size}', []).append(dict(maze.timings))
+        return build
+
+for width, height in ((20, 15), (32, 32)):
+    @benchmark(f'next_hops/{width}x{height}', number=1)
+    def next_hops_setup(width=width, height=height):
+        maze = Maze(width, height, 2, seed=width)
+        return maze.build_next_hops
+
+for vectorized in (False, True):
+    mode = 'vectorized' if vectorized else 'objects'
+
+    @benchmark(f'tower_wake/400_enemies/{mode}')
+    def tower_wake_setup(vectorized=vectorized):
+        game = started_game(40, 40, vectorized)
+        rng = random.Random(2)
+        add_crowd(game, 400, rng)
+        for _ in range(50):
+            game.add_tower(Tower(*game.maze.occupancy.random_free(rng)))
+        def update():
+            game.tick += 10 ** 3  # far enough apart that every tower has cooled down
+            game.update_towers()
+            if game.entity_store:
+                game.entity_store.remove_projectiles(range(len(game.projectiles)))
+            else:
+                for proj in game.projectiles:
+                    game.projectile_pool.release(proj)
+                game.projectiles.clear()
+        return update
+
+    @benchmark(f'projectile_update/400_enemies/{mode}')
+    def projectile_update_setup(vectorized=vectorized):
+        game = started_game(40, 40, vectorized)
+        rng = random.Random(3)
+        add_crowd(game, 400, rng)
+        for enemy in game.enemies[:200]:
+            enemy.hit_points = 10 ** 6  # keep the crowd alive across calls
+            if game.entity_store:
+                game.entity_store.enemy_hp[enemy.slot] = enemy.hit_points
+        starts = [(rng.randrange(40 * Constants.TILE_SIZE), rng.randrange(40 * Constants.TILE_SIZE)) for _ in range(200)]
+        for start, enemy in zip(starts, game.enemies[:200]):
+            game.add_projectile(Projectile(start, enemy, 1))
+        if game.entity_store:
+            return lambda: game.entity_store.update_projectiles(game)
+        def update():
+            game.projectiles[:] = [p for p in game.projectiles if not p.update(game.enemies, game)]
+        return update
+
+@benchmark('tower_phase/60_towers/40_enemies')
+def tower_phase_setup():
+    game = started_game(40, 40)
+    rng = random.Random(5)
+    add_crowd(game, 40, rng)
+    for _ in range(60):
+        game.add_tower(Tower(*game.maze.occupancy.random_free(rng)))
+    def update():
+        game.tick += 1
+        game.update_towers()
+        game.projectiles.clear()
+    return update
+
+@benchmark('player_update/collision')
+def player_update_setup():
+    game = started_game()
+    directions = [KeyState([key]) for key in (pygame.K_LEFT, pygame.K_UP, pygame.K_RIGHT, pygame.K_DOWN)]
+    def update():
+        game.tick += 1
+        game.player.update(directions[game.tick // 15 % 4], game)
+    return update
+
+@benchmark('get_empty_cells/100x100')
+def get_empty_cells_setup():
+    game = started_game(100, 100)
+    return game.get_empty_cells
+
+def drawing_game(width, height):
+    screen = pygame.display.set_mode((Constants.SCREEN_WIDTH, Constants.SCREEN_HEIGHT))
+    game = started_game(width, height, screen=screen)
+    rng = random.Random(4)
+    add_crowd(game, 100, rng)
+    for _ in range(20):
+        game.add_tower(Tower(*game.maze.occupancy.random_free(rng)))
+    return game
+
+for width, height in ((20, 15), (200, 200)):
+    @benchmark(f'draw/full_frame/{width}x{height}')
+    def draw_full_setup(width=width, height=height):
+        game = drawing_game(width, height)
+        def draw():
+            game.dirty_rects = None
+            game.draw(game.screen, 1000)
+        return draw
+
+    @benchmark(f'draw/dirty_frame/{width}x{height}')
+    def draw_dirty_setup(width=width, height=height):
+        game = drawing_game(width, height)
+        game.draw(game.screen, 0)
+        frames = iter(range(33, 10 ** 9, 33))
+        return lambda: game.draw(game.screen, next(frames))
+
+
+def compare(results, baseline, threshold):
+    """names whose best time got slower than the baseline's by more than threshold (a fraction)"""
+    # the minimum is compared rather than the median since it is the least disturbed by other load on the machine
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        ratio = result['min_ms'] / before['min_ms']
+        status = 'REGRESSION' if ratio > 1 + threshold else 'faster' if ratio < 1 - threshold else 'same'
+        print(f"{name:45} {before['min_ms']:10.4f} -> {result['min_ms']:10.4f} ms  x{ratio:.2f}  {status}",
+              file=sys.stderr)
+        if status == 'REGRESSION':
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the game's hot paths headless and write the results as JSON")
+    parser.add_argument('--filter', default='', help="only run benchmarks whose name contains this text")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument('--number', type=int, default=10, help="calls per timed run")
+    parser.add_argument('--output', help="write the JSON results to this file instead of stdout")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="slowdown fraction that counts as a regression")
+    args = parser.parse_args()
+
+    pygame.init()
+    results = {}
+    for name, (setup, number) in BENCHMARKS.items():
+        if args.filter not in name or ('vectorized' in name and not HAS_NUMPY):
+            continue
+        number = number or args.number
+        samples = [seconds * 1000 for seconds in measure(setup, args.repeat, number)]
+        results[name] = {'median_ms': statistics.median(samples), 'min_ms': min(samples),
+                         'repeat': args.repeat, 'number': number}
+        if name in PHASE_TIMINGS:
+            phases = PHASE_TIMINGS[name]
+            results[name]['phases_ms'] = {phase: statistics.median(run[phase] for run in phases) * 1000
+                                          for phase in phases[0]}
+        print(f"{name:45} {results[name]['median_ms']:10.4f} ms", file=sys.stderr)
+
+    report = {'python': platform.python_version(), 'pygame': pygame.version.ver, 'platform': platform.platform(),
+              'numpy': HAS_NUMPY, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
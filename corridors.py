@@ -0,0 +1,229 @@
+# corridors.py
+import time
+from heapq import heappop, heappush
+from itertools import repeat
+from utils import Directions
+
+# per-mask lookup tables for the graph build
+HAS_E = bytes(Directions.W if value & Directions.E else 0 for value in range(256))
+HAS_W = bytes(Directions.E if value & Directions.W else 0 for value in range(256))
+HAS_S = bytes(Directions.N if value & Directions.S else 0 for value in range(256))
+HAS_N = bytes(Directions.S if value & Directions.N else 0 for value in range(256))
+DEGREE = bytes(bin(value).count('1') for value in range(256))
+OPPOSITE = {bit: opposite for bit, _, _, opposite in Directions.STEPS}
+GOAL = -1  # search node standing for the goal cell when it lies inside a corridor
+START = -2  # came_from marker for the start cell when it lies inside a corridor
+
+class CorridorGraph:
+    """the maze compressed to its junctions, joined by one weighted edge per walkable corridor direction
+
+    A junction is any cell that does not have exactly two open sides (counting passages in either
+    direction); every other cell sits inside a corridor. An edge leaves a junction through one of its
+    passages and follows the corridor to the next junction, and only exists if every one-way wall along
+    the way lets it through. Searches run over the junctions and return a LazyPath that turns the
+    corridor edges back into cells as they are read.
+    """
+    def __init__(self, maze):
+        self.width = maze.width
+        self.height = maze.height
+        self.cells = cells = maze.cells
+        width = self.width
+        self.offsets = {bit: dy * width + dx for bit, dx, dy, _ in Directions.STEPS}
+        # every open side of each cell, passages into it included
+        links = int.from_bytes(cells, 'little')
+        for incoming in (b'\0' + cells.translate(HAS_E)[:-1], cells.translate(HAS_W)[1:] + b'\0',
+                         b'\0' * width + cells.translate(HAS_S)[:-width],
+                         cells.translate(HAS_N)[width:] + b'\0' * width):
+            links |= int.from_bytes(incoming, 'little')
+        self.links = links.to_bytes(len(cells), 'little')
+        degrees = self.links.translate(DEGREE)
+        self.is_junction = degrees.translate(bytes(value != 2 for value in range(256)))
+        self.edges = {}  # junction -> [(junction, length, first step bit, junction x, junction y)]
+        for junction in (index for index, flag in enumerate(self.is_junction) if flag):
+            self.edges[junction] = self.corridors_from(junction)
+
+    def corridors_from(self, junction):
+        edges = []
+        mask = self.cells[junction]
+        for bit in self.offsets:
+            if mask & bit:
+                end, length, _ = self.walk(junction, bit)
+                if end is not None and end != junction:
+                    edges.append((end, length, bit, end % self.width, end // self.width))
+        return edges
+
+    def walk(self, cell, bit, stop=None):
+        """follow a corridor from cell through bit to the first junction or to stop, whichever comes first;
+        returns (end cell or None when a one-way wall blocks the way, steps taken, bit of the last step)"""
+        cells, links, is_junction, offsets = self.cells, self.links, self.is_junction, self.offsets
+        start = cell
+        length = 0
+        while True:
+            cell += offsets[bit]
+            length += 1
+            if is_junction[cell] or cell == stop or cell == start:
+                return cell, length, bit
+            bit = links[cell] ^ OPPOSITE[bit]  # the corridor's other side
+            if not cells[cell] & bit:
+                return None, length, bit
+
+    def entries(self, goal):
+        """{junction: (steps to goal, first step bit)} for the junctions whose corridor leads into goal"""
+        cells, links, is_junction, offsets = self.cells, self.links, self.is_junction, self.offsets
+        found = {}
+        for side in offsets:
+            if not links[goal] & side:
+                continue
+            # walk backwards: from cell, the step toward the goal goes through toward_goal
+            toward_goal = OPPOSITE[side]
+            cell = goal + offsets[side]
+            length = 1
+            while True:
+                if not cells[cell] & toward_goal:
+                    break
+                if is_junction[cell]:
+                    if cell not in found or length < found[cell][0]:
+                        found[cell] = (length, toward_goal)
+                    break
+                if cell == goal:
+                    break
+                away = links[cell] ^ toward_goal
+                toward_goal = OPPOSITE[away]
+                cell += offsets[away]
+                length += 1
+        return found
+
+    def search(self, start, goal):
+        return CorridorSearch(self, start, goal)
+
+    def find_path(self, start, goal):
+        search = CorridorSearch(self, start, goal)
+        search.run()
+        return search.path
+
+
+class CorridorSearch:
+    """A* over the junction graph that can stop when a deadline passes and carry on from the same open set later"""
+    CLOCK_CHECK = 64
+
+    def __init__(self, graph, start, goal):
+        self.graph = graph
+        self.start = start
+        self.goal = goal
+        width = graph.width
+        self.start_index = start_index = start[1] * width + start[0]
+        self.goal_index = goal_index = goal[1] * width + goal[0]
+        self.path = None
+        self.g_score = {}
+        self.came_from = {}  # node -> (previous node or START, first step bit from it, steps)
+        self.open_heap = []
+        if start_index == goal_index:
+            self.path = LazyPath(graph, start, [])
+            return
+        self.goal_entries = {goal_index: (0, 0)} if graph.is_junction[goal_index] else graph.entries(goal_index)
+        if graph.is_junction[start_index]:
+            self.reach(start_index, 0, None)
+        else:
+            for bit in graph.offsets:
+                if graph.cells[start_index] & bit:
+                    end, length, _ = graph.walk(start_index, bit, stop=goal_index)
+                    if end == goal_index:
+                        self.reach(GOAL, length, (START, bit, length))
+                    elif end is not None and end != start_index:
+                        self.reach(end, length, (START, bit, length))
+
+    def reach(self, node, g, step):
+        if node in self.g_score and self.g_score[node] <= g:
+            return
+        self.g_score[node] = g
+        self.came_from[node] = step
+        if node == GOAL:
+            heappush(self.open_heap, (g, g, node))
+        else:
+            width = self.graph.width
+            h = abs(node % width - self.goal[0]) + abs(node // width - self.goal[1])
+            heappush(self.open_heap, (g + h, g, node))
+
+    def run(self, deadline_ns=None):
+        """expand junctions until the search finishes or perf_counter_ns() passes deadline_ns; returns whether it finished"""
+        if self.path is not None:
+            return True
+        edges, goal_entries, g_score, open_heap = self.graph.edges, self.goal_entries, self.g_score, self.open_heap
+        came_from = self.came_from
+        goal_x, goal_y = self.goal
+        chunk = self.CLOCK_CHECK if deadline_ns is not None else len(edges) * 4 + 2
+        while open_heap:
+            for _ in repeat(None, chunk):
+                if not open_heap:
+                    break
+                _, g, node = heappop(open_heap)
+                if g > g_score[node]:
+                    continue  # stale heap entry
+                if node == GOAL:
+                    self.path = self.build_path()
+                    return True
+                entry = goal_entries.get(node)
+                if entry is not None:
+                    steps, bit = entry
+                    self.reach(GOAL, g + steps, (node, bit, steps))
+                for end, length, bit, x, y in edges[node]:
+                    end_g = g + length
+                    old_g = g_score.get(end)
+                    if old_g is None or end_g < old_g:
+                        g_score[end] = end_g
+                        came_from[end] = (node, bit, length)
+                        heappush(open_heap, (end_g + abs(x - goal_x) + abs(y - goal_y), end_g, end))
+            if deadline_ns is not None and open_heap and time.perf_counter_ns() >= deadline_ns:
+                return False
+        self.path = LazyPath(self.graph, self.start, None)
+        return True
+
+    def build_path(self):
+        segments = []
+        node = GOAL
+        while node != START and node != self.start_index:
+            previous, bit, steps = self.came_from[node]
+            segments.append((self.start_index if previous == START else previous, bit, steps))
+            node = previous
+        return LazyPath(self.graph, self.start, segments[::-1])
+
+
+class LazyPath:
+    """cells of a corridor-graph path as a sequence, produced one corridor at a time as they are indexed
+
+    Cached paths are shared between enemies, so each corridor is only walked once whoever reaches it first.
+    """
+    def __init__(self, graph, start, segments):
+        self.graph = graph
+        self.segments = segments or []  # (cell, first step bit, steps), in order; None when the goal is unreachable
+        self.expanded = 0
+        self.cells = [start]
+        self.length = 0 if segments is None else 1 + sum(steps for _, _, steps in segments)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        while index >= len(self.cells):
+            self.expand()
+        return self.cells[index]
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self[index]
+
+    def expand(self):
+        graph = self.graph
+        width, links, offsets = graph.width, graph.links, graph.offsets
+        cell, bit, steps = self.segments[self.expanded]
+        self.expanded += 1
+        append = self.cells.append
+        for step in range(steps):
+            cell += offsets[bit]
+            append((cell % width, cell // width))
+            if step < steps - 1:
+                bit = links[cell] ^ OPPOSITE[bit]
@@ -1,95 +1,102 @@
 # enemy.py
 import math
-import pygame
 import random
-from utils import a_star, Colors, Constants
+from utils import Constants
 
 class Enemy:
-    def __init__(self, spawn, behavior, maze, wave_number):
-        self.pos = [spawn[0] * Constants.TILE_SIZE + 16, spawn[1] * Constants.TILE_SIZE + 16]
+    __slots__ = ('pos', 'behavior', 'speed', 'path', 'path_index', 'maze', 'target', 'waiting', 'rng',
+                 'max_hit_points', 'hit_points', 'slot', 'generation')
+
+    def __init__(self, spawn, behavior, maze, wave_number, rng=random):
+        self.pos = [0.0, 0.0]
+        self.generation = 0  # bumped each time the enemy dies and goes back to its pool
+        self.reset(spawn, behavior, maze, wave_number, rng)
+
+    def reset(self, spawn, behavior, maze, wave_number, rng=random):
+        self.pos[0] = spawn[0] * Constants.TILE_SIZE + 16
+        self.pos[1] = spawn[1] * Constants.TILE_SIZE + 16
         self.behavior = behavior
         self.speed = 0.75 * Constants.TILE_SIZE / Constants.FPS
-        self.path = []
+        self.path = ()
+        self.path_index = 0
         self.maze = maze
         self.target = None
+        self.waiting = False  # a path to target has been requested and is not ready yet
+        self.rng = rng  # picks the destinations of 'random_path' enemies
         self.max_hit_points = wave_number
         self.hit_points = wave_number
+        self.slot = -1  # index in Game.enemies
 
     def update(self, player, game):
         half_tile_size = Constants.TILE_SIZE // 2
-        if not self.path:
-            start = (int(self.pos[0] / Constants.TILE_SIZE), int(self.pos[1] / Constants.TILE_SIZE))
-            if self.behavior == 'shortest':
-                self.target = self.maze.base
-            elif self.behavior == 'chase':
-                self.target = (int(player.pos[0] / Constants.TILE_SIZE), int(player.pos[1] / Constants.TILE_SIZE))
-            else: #random_path
-                if not self.target or start == self.target: #reached the random location
-                    self.target = (random.randint(0, self.maze.width - 1), random.randint(0, self.maze.height - 1))
-            self.path = a_star(start, self.target, self.maze.grid)
-
-        if self.path and game.freeze_timer <= 0:
-            next_pos = (self.path[0][0] * Constants.TILE_SIZE + half_tile_size, self.path[0][1] * Constants.TILE_SIZE + half_tile_size)
+        next_tile = self.next_waypoint(player)
+        if next_tile and game.freeze_timer <= 0:
+            next_pos = (next_tile[0] * Constants.TILE_SIZE + half_tile_size, next_tile[1] * Constants.TILE_SIZE + half_tile_size)
             dx = next_pos[0] - self.pos[0]
             dy = next_pos[1] - self.pos[1]
             dist = math.hypot(dx, dy)
             if dist < self.speed:
-                self.pos = list(next_pos)
-                del self.path[0]
+                self.pos[0], self.pos[1] = next_pos
+                self.path_index += 1
             else:
                 angle = math.atan2(dy, dx)
                 self.pos[0] += math.cos(angle) * self.speed
                 self.pos[1] += math.sin(angle) * self.speed
 
-        self_center_x = self.pos[0]
-        self_center_y = self.pos[1]
         base_center_x = self.maze.base[0] * Constants.TILE_SIZE + half_tile_size
         base_center_y = self.maze.base[1] * Constants.TILE_SIZE + half_tile_size
-        half_player_w = player.w // 2
-        half_player_h = player.h // 2
-        player_center_x = player.pos[0] + half_player_w
-        player_center_y = player.pos[1] + half_player_h
-        if math.hypot(self_center_x - base_center_x,
-                      self_center_y - base_center_y) < 4:
-            game.base_health -= self.hit_points
-            game.score -= min(25, game.score)
+        if math.hypot(self.pos[0] - base_center_x, self.pos[1] - base_center_y) < 4:
+            self.hit_base(game)
             return True
-        if math.hypot(self_center_x - player_center_x, self_center_y - player_center_y) < 14:
-            if player.invincible:
-                game.score += 10
-                return True
-            elif player.resources > 0:
-                player.resources = max(0, player.resources - max(1, player.resources // 4))
-                game.score -= min(10, game.score)
-                return True
-            else:
-                player.current_speed = player.current_speed * 0.75
-                player.slow_timer = 5 * Constants.FPS
-                return True
         return False
 
-    def draw(self, screen, time):
+    def touches_player(self, player):
+        return math.hypot(self.pos[0] - (player.pos[0] + player.w // 2),
+                          self.pos[1] - (player.pos[1] + player.h // 2)) < 14
+
+    def next_waypoint(self, player):
+        """tile the enemy is walking to, replanning once the current path is used up"""
+        if self.path_index >= len(self.path):
+            start = (int(self.pos[0] / Constants.TILE_SIZE), int(self.pos[1] / Constants.TILE_SIZE))
+            if self.behavior == 'shortest':
+                self.target = self.maze.base
+                next_hop = self.maze.flow_field.get_next(start) #shared by every 'shortest' enemy
+                self.path = (next_hop,) if next_hop else ()
+            else:
+                if self.waiting:
+                    pass  # ask again for the same path rather than queueing a search per tick
+                elif self.behavior == 'chase':
+                    self.target = (int(player.pos[0] / Constants.TILE_SIZE), int(player.pos[1] / Constants.TILE_SIZE))
+                elif not self.target or start == self.target: #random_path reached the random location
+                    self.target = (self.rng.randint(0, self.maze.width - 1), self.rng.randint(0, self.maze.height - 1))
+                next_hops = self.maze.next_hops
+                if next_hops and next_hops.ready:
+                    next_tile = next_hops.next_tile(start, self.target)
+                    self.waiting = False
+                    self.path = (next_tile,) if next_tile else ()
+                else:
+                    path = self.maze.request_path(start, self.target)
+                    self.waiting = path is None  # stand still until the search finishes
+                    self.path = path or ()
+            self.path_index = 0
+        return self.path[self.path_index] if self.path_index < len(self.path) else None
+
+    def hit_base(self, game):
+        game.base_health -= self.hit_points
+        game.score -= min(25, game.score)
+
+    def hit_player(self, player, game):
+        if player.invincible:
+            game.score += 10
+        elif player.resources > 0:
+            player.resources = max(0, player.resources - max(1, player.resources // 4))
+            game.score -= min(10, game.score)
+        else:
+            player.current_speed = player.current_speed * 0.75
+            player.slow_timer = 5 * Constants.FPS
+
+    def sprites(self, atlas, time):
         cx = int(self.pos[0])
         cy = int(self.pos[1])
-        arc_points = []
-        for angle in range(180, 0, -18):
-           rad = math.radians(angle)
-           px = cx + 12 * math.cos(rad)
-           py = cy + 12 * -math.sin(rad)
-           arc_points.append((px, py))
-        phase = time / 100.0
-        wavy_points = []
-        num_wavy = 10
-        for i in range(num_wavy + 1):
-           t = i / num_wavy
-           x = cx + 12 - t * 24
-           wave = 2 * math.sin(4 * math.pi * t + phase)
-           y = cy + 12 + wave
-           wavy_points.append((x, y))
-        points = [(cx - 12, cy)] + arc_points + [(cx + 12, cy + 12)] + wavy_points + [(cx - 12, cy + 12), (cx - 12, cy)]
-        pygame.draw.polygon(screen, Colors.RED, points)
-        ratio = self.hit_points / self.max_hit_points
-        color = Colors.GREEN if ratio > 0.5 else Colors.YELLOW if ratio > 0.25 else Colors.RED
-        bar_width = int(24 * ratio)
-        pygame.draw.rect(screen, color, (cx - 12, cy + 14, bar_width, 4))
-        pygame.draw.rect(screen, Colors.BLACK, (cx - 12, cy + 14, 24, 4), 1)
\ No newline at end of file
+        return ((atlas.ghost(time), (cx - 12, cy - 12)),
+                (atlas.health_bar(self.hit_points / self.max_hit_points), (cx - 12, cy + 14)))
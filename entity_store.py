@@ -0,0 +1,257 @@
+# entity_store.py
+from utils import Constants
+
+try:
+    import numpy as np
+except ImportError:  # the vectorized store is optional; Game falls back to per-object updates
+    np = None
+
+HAS_NUMPY = np is not None
+
+class EntityStore:
+    """structure-of-arrays storage for enemies and projectiles, updated for the whole wave at once
+
+    Enemy.pos and Projectile.pos are rebound to rows of the position arrays, so drawing and tower
+    targeting keep reading the objects while movement and collisions run as array operations.
+    """
+    def __init__(self, capacity=64, enemy_pool=None, projectile_pool=None):
+        if np is None:
+            raise ImportError("the vectorized entity store requires numpy")
+        self.enemy_pool = enemy_pool  # removed entities are released here when given
+        self.projectile_pool = projectile_pool
+        self.enemies = []
+        self.projectiles = []
+        self.enemy_capacity = 0
+        self.projectile_capacity = 0
+        self.grow_enemies(capacity)
+        self.grow_projectiles(capacity)
+
+    def grow_enemies(self, capacity):
+        count = len(self.enemies)
+        old = (self.enemy_pos, self.enemy_waypoint, self.enemy_has_waypoint, self.enemy_speed, self.enemy_hp) \
+            if self.enemy_capacity else None
+        self.enemy_pos = np.zeros((capacity, 2))
+        self.enemy_waypoint = np.zeros((capacity, 2))
+        self.enemy_has_waypoint = np.zeros(capacity, dtype=bool)
+        self.enemy_speed = np.zeros(capacity)
+        self.enemy_hp = np.zeros(capacity)
+        if old:
+            for new_array, old_array in zip((self.enemy_pos, self.enemy_waypoint, self.enemy_has_waypoint,
+                                              self.enemy_speed, self.enemy_hp), old):
+                new_array[:count] = old_array[:count]
+        self.enemy_capacity = capacity
+        for slot, enemy in enumerate(self.enemies):
+            enemy.pos = self.enemy_pos[slot]
+
+    def grow_projectiles(self, capacity):
+        count = len(self.projectiles)
+        old = (self.projectile_pos, self.projectile_target, self.projectile_speed, self.projectile_damage) \
+            if self.projectile_capacity else None
+        self.projectile_pos = np.zeros((capacity, 2))
+        self.projectile_target = np.full(capacity, -1, dtype=np.intp)
+        self.projectile_speed = np.zeros(capacity)
+        self.projectile_damage = np.zeros(capacity)
+        if old:
+            for new_array, old_array in zip((self.projectile_pos, self.projectile_target,
+                                              self.projectile_speed, self.projectile_damage), old):
+                new_array[:count] = old_array[:count]
+        self.projectile_capacity = capacity
+        for slot, proj in enumerate(self.projectiles):
+            proj.pos = self.projectile_pos[slot]
+
+    def add_enemy(self, enemy):
+        slot = len(self.enemies)
+        if slot == self.enemy_capacity:
+            self.grow_enemies(self.enemy_capacity * 2)
+        self.enemy_pos[slot] = enemy.pos
+        self.enemy_has_waypoint[slot] = False
+        self.enemy_speed[slot] = enemy.speed
+        self.enemy_hp[slot] = enemy.hit_points
+        enemy.pos = self.enemy_pos[slot]
+        enemy.slot = slot
+        self.enemies.append(enemy)
+
+    def add_projectile(self, proj):
+        slot = len(self.projectiles)
+        if slot == self.projectile_capacity:
+            self.grow_projectiles(self.projectile_capacity * 2)
+        self.projectile_pos[slot] = proj.pos
+        self.projectile_target[slot] = proj.enemy.slot
+        self.projectile_speed[slot] = proj.speed
+        self.projectile_damage[slot] = proj.damage
+        proj.pos = self.projectile_pos[slot]
+        proj.slot = slot
+        self.projectiles.append(proj)
+
+    def remove_enemies(self, slots):
+        # swap-remove from the highest slot down so the row moved into a hole is never itself pending removal
+        for slot in sorted(slots, reverse=True):
+            last = len(self.enemies) - 1
+            removed = self.enemies[slot]
+            removed.pos = [float(removed.pos[0]), float(removed.pos[1])]
+            self.projectile_target[self.projectile_target == slot] = -1
+            if slot != last:
+                for array in (self.enemy_pos, self.enemy_waypoint, self.enemy_has_waypoint, self.enemy_speed, self.enemy_hp):
+                    array[slot] = array[last]
+                moved = self.enemies[last]
+                moved.pos = self.enemy_pos[slot]
+                moved.slot = slot
+                self.enemies[slot] = moved
+                self.projectile_target[self.projectile_target == last] = slot
+            self.enemies.pop()
+            if self.enemy_pool:
+                self.enemy_pool.release(removed)
+
+    def remove_projectiles(self, slots):
+        for slot in sorted(slots, reverse=True):
+            last = len(self.projectiles) - 1
+            removed = self.projectiles[slot]
+            removed.pos = [float(removed.pos[0]), float(removed.pos[1])]
+            if slot != last:
+                for array in (self.projectile_pos, self.projectile_target, self.projectile_speed, self.projectile_damage):
+                    array[slot] = array[last]
+                moved = self.projectiles[last]
+                moved.pos = self.projectile_pos[slot]
+                moved.slot = slot
+                self.projectiles[slot] = moved
+            self.projectiles.pop()
+            if self.projectile_pool:
+                self.projectile_pool.release(removed)
+
+    def update_enemies(self, game):
+        count = len(self.enemies)
+        if not count:
+            return
+        player = game.player
+        pos = self.enemy_pos[:count]
+        waypoint = self.enemy_waypoint[:count]
+        has_waypoint = self.enemy_has_waypoint[:count]
+
+        half_tile_size = Constants.TILE_SIZE // 2
+        for slot in np.flatnonzero(~has_waypoint):
+            next_tile = self.enemies[slot].next_waypoint(player)
+            if next_tile:
+                waypoint[slot] = (next_tile[0] * Constants.TILE_SIZE + half_tile_size,
+                                  next_tile[1] * Constants.TILE_SIZE + half_tile_size)
+                has_waypoint[slot] = True
+
+        if game.freeze_timer <= 0:
+            speed = self.enemy_speed[:count]
+            delta = waypoint - pos
+            dist = np.hypot(delta[:, 0], delta[:, 1])
+            arrived = has_waypoint & (dist < speed)
+            moving = has_waypoint & ~arrived
+            pos[arrived] = waypoint[arrived]
+            pos[moving] += delta[moving] * (speed[moving] / dist[moving])[:, None]
+            for slot in np.flatnonzero(arrived):
+                self.enemies[slot].path_index += 1
+            has_waypoint[arrived] = False
+
+        base_x = game.maze.base[0] * Constants.TILE_SIZE + half_tile_size
+        base_y = game.maze.base[1] * Constants.TILE_SIZE + half_tile_size
+        at_base = np.hypot(pos[:, 0] - base_x, pos[:, 1] - base_y) < 4
+        at_player = np.hypot(pos[:, 0] - (player.pos[0] + player.w // 2),
+                             pos[:, 1] - (player.pos[1] + player.h // 2)) < 14
+        hits = np.flatnonzero(at_base | at_player)
+        for slot in hits:
+            if at_base[slot]:
+                self.enemies[slot].hit_base(game)
+            else:
+                self.enemies[slot].hit_player(player, game)
+        if len(hits):
+            self.remove_enemies(hits.tolist())
+            game.destroyed_enemies += len(hits)
+
+    def find_targets(self, centers, radii, base_center, width, height):
+        """for each circle, the enemy closest to the base among those inside it, or None
+
+        Only enemies on the tiles of each circle's bounding box are measured, found through a tile index
+        (enemy slots sorted by tile), and every circle is handled in the same few array operations.
+        Ties go to the lowest slot.
+        """
+        count = len(self.enemies)
+        if not count or not centers:
+            return [None] * len(centers)
+        pos = self.enemy_pos[:count]
+        keys = self.tile_keys(width, height)
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+
+        # one run of tile keys per bounding-box row of each circle
+        circles = np.array(centers, dtype=float)
+        radii = np.asarray(radii, dtype=float)
+        low = np.maximum(np.trunc(circles - radii[:, None]).astype(np.intp) // Constants.TILE_SIZE, 0)
+        high = np.minimum(np.trunc(circles + radii[:, None]).astype(np.intp) // Constants.TILE_SIZE,
+                          (width - 1, height - 1))
+        rows = high[:, 1] - low[:, 1] + 1
+        run_circle = np.repeat(np.arange(len(centers)), rows)
+        run_row = np.repeat(low[:, 1] - (np.cumsum(rows) - rows), rows) + np.arange(len(run_circle))
+        run_first = run_row * width + low[run_circle, 0]
+        run_last = run_row * width + high[run_circle, 0]
+        starts = np.searchsorted(keys, run_first)
+        lengths = np.searchsorted(keys, run_last, side='right') - starts
+        total = int(lengths.sum())
+        if not total:
+            return [None] * len(centers)
+        # (circle, slot) pairs for every enemy in those runs
+        run_offsets = np.cumsum(lengths) - lengths
+        pair_circle = np.repeat(run_circle, lengths)
+        pair_slot = order[np.repeat(starts - run_offsets, lengths) + np.arange(total)]
+
+        candidates = pos[pair_slot]
+        inside = np.hypot(candidates[:, 0] - circles[pair_circle, 0],
+                          candidates[:, 1] - circles[pair_circle, 1]) <= radii[pair_circle]
+        pair_circle, pair_slot, candidates = pair_circle[inside], pair_slot[inside], candidates[inside]
+        base_dist = np.hypot(candidates[:, 0] - base_center[0], candidates[:, 1] - base_center[1])
+        ranked = np.lexsort((pair_slot, base_dist, pair_circle))
+        best = ranked[np.flatnonzero(np.diff(pair_circle[ranked], prepend=-1))]
+        targets = [None] * len(centers)
+        for circle, slot in zip(pair_circle[best].tolist(), pair_slot[best].tolist()):
+            targets[circle] = self.enemies[slot]
+        return targets
+
+    def enemies_in_rect(self, left, top, right, bottom):
+        pos = self.enemy_pos[:len(self.enemies)]
+        inside = np.flatnonzero((pos[:, 0] >= left) & (pos[:, 0] < right) & (pos[:, 1] >= top) & (pos[:, 1] < bottom))
+        return [self.enemies[slot] for slot in inside]
+
+    def tile_keys(self, width, height):
+        """tile index (y * width + x) under each enemy, by slot"""
+        tiles = (self.enemy_pos[:len(self.enemies)] // Constants.TILE_SIZE).astype(np.intp)
+        np.clip(tiles, 0, (width - 1, height - 1), out=tiles)
+        return tiles[:, 1] * width + tiles[:, 0]
+
+    def occupied_tiles(self, width, height):
+        """indices (y * width + x) of the tiles under at least one enemy"""
+        return np.unique(self.tile_keys(width, height)).tolist()
+
+    def update_projectiles(self, game):
+        count = len(self.projectiles)
+        if not count:
+            return
+        pos = self.projectile_pos[:count]
+        target = self.projectile_target[:count]
+        orphaned = target < 0
+        delta = self.enemy_pos[np.where(orphaned, 0, target)] - pos
+        dist = np.hypot(delta[:, 0], delta[:, 1])
+        speed = self.projectile_speed[:count]
+        hit = ~orphaned & (dist < speed)
+        moving = ~orphaned & ~hit
+        pos[moving] += delta[moving] * (speed[moving] / dist[moving])[:, None]
+
+        finished = orphaned | hit
+        if hit.any():
+            hit_targets = target[hit]
+            np.subtract.at(self.enemy_hp, hit_targets, self.projectile_damage[:count][hit])
+            hit_targets = np.unique(hit_targets)
+            for slot in hit_targets:
+                self.enemies[slot].hit_points = int(self.enemy_hp[slot])
+            killed = hit_targets[self.enemy_hp[hit_targets] <= 0].tolist()
+            if killed:
+                game.destroyed_enemies += len(killed)
+                game.score += 10 * len(killed)
+        else:
+            killed = []
+        self.remove_projectiles(np.flatnonzero(finished).tolist())
+        if killed:
+            self.remove_enemies(killed)
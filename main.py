@@ -4,52 +4,55 @@ import platform
 import pygame
 import random
 from maze import Maze
+from pathfinding import PathService
+from pool import Pool, swap_remove
+from profiler import FrameProfiler
+from timestep import FixedTimestep
+from rng import RandomStreams
 from player import Player
+from spatial import TileIndex
+from sprites import SpriteAtlas
 from enemy import Enemy
+from tower import Projectile
+from tower_scheduler import TowerScheduler
+from entity_store import EntityStore, HAS_NUMPY
 from ui import UI
 from utils import Colors, Constants
-
-pygame.init()
-screen = pygame.display.set_mode((Constants.SCREEN_WIDTH, Constants.SCREEN_HEIGHT))
-pygame.display.set_caption("Maze Defender")
-clock = pygame.time.Clock()
-
-def draw_one_way_wall(screen, wall_type, x, y, direction, tile_size=Constants.TILE_SIZE):
-    if wall_type == 'vertical':
-        px = (x + 1) * tile_size
-        py_top = y * tile_size
-        py_bottom = (y + 1) * tile_size
-        py_mid = (py_top + py_bottom) / 2
-        if direction == 'east':
-            pygame.draw.line(screen, Colors.DARK_GRAY, (px - 2, py_top), (px + 2, py_mid), 2)
-            pygame.draw.line(screen, Colors.LIGHT_GRAY, (px - 2, py_bottom), (px + 2, py_mid), 2)
-        else:  # 'west'
-            pygame.draw.line(screen, Colors.LIGHT_GRAY, (px + 2, py_top), (px - 2, py_mid), 2)
-            pygame.draw.line(screen, Colors.DARK_GRAY, (px + 2, py_bottom), (px - 2, py_mid), 2)
-    elif wall_type == 'horizontal':
-        py = (y + 1) * tile_size
-        px_left = x * tile_size
-        px_right = (x + 1) * tile_size
-        px_mid = (px_left + px_right) / 2
-        if direction == 'south':
-            pygame.draw.line(screen, Colors.DARK_GRAY, (px_left, py - 2), (px_mid, py + 2), 2)
-            pygame.draw.line(screen, Colors.LIGHT_GRAY, (px_right, py - 2), (px_mid, py + 2), 2)
-        else:  # 'north'
-            pygame.draw.line(screen, Colors.LIGHT_GRAY, (px_left, py + 2), (px_mid, py - 2), 2)
-            pygame.draw.line(screen, Colors.DARK_GRAY, (px_right, py + 2), (px_mid, py - 2), 2)
-
+from viewport import Camera, MazeChunks
 
 class Game:
-    def __init__(self):
+    # past this many dirty rects in a frame, or this much dirty area, one full repaint and flip costs less
+    MAX_DIRTY_RECTS = 64
+    MAX_DIRTY_AREA = Constants.SCREEN_WIDTH * Constants.SCREEN_HEIGHT // 2
+
+    def __init__(self, screen=None, vectorized=False, maze_library=None, seed=None, path_budget_us=None, path_workers=0):
+        # without a screen the game runs headless: no UI, no drawing, input comes from step()
+        self.screen = screen
+        self.vectorized = vectorized  # move enemies and projectiles through a numpy EntityStore
+        self.maze_library = maze_library  # MazeLibrary to draw ready-made mazes from instead of generating them
+        # a session is reproducible from its seed plus the keys passed to each step()
+        self.seed = random.getrandbits(32) if seed is None else seed
+        # with no budget and no workers paths are found the moment they are asked for, which replays rely on
+        self.path_budget_us = path_budget_us  # microseconds of queued pathfinding per tick
+        self.path_workers = path_workers  # processes searching paths in the background instead
+        self.rng = RandomStreams(self.seed)
+        self.recorder = None  # replay.Recorder capturing each update's input
+        self.profiler = None  # FrameProfiler timing each phase of a frame; None costs one check per phase
+        self.show_profiler = False
+        self.entity_store = None
+        # dead enemies and spent projectiles are recycled, so crowded waves allocate next to nothing
+        self.enemy_pool = Pool(Enemy)
+        self.projectile_pool = Pool(Projectile)
         self.state = 'menu'
-        self.menu_params = {'width': [20,{'min':10,'max':25}],
-                            'height': [15,{'min':10,'max':16}],
+        self.menu_params = {'width': [20,{'min':10,'max':200}],
+                            'height': [15,{'min':10,'max':200}],
                             'spawns': 2, 'waves': 5, 'enemies': 10}
         self.menu_select = 0
-        self.maze = Maze(self.menu_params['width'][0], self.menu_params['height'][0], self.menu_params['spawns'])
-        self.player = Player(self.maze)
+        self.maze = None  # built by start_game once the menu parameters are chosen
+        self.player = None
         self.enemies = []
         self.towers = []
+        self.towers_version = 0  # bumped when a tower is built or upgraded, so the background redraws it
         self.projectiles = []
         self.base_health = 100
         self.score = 0
@@ -61,20 +64,61 @@ class Game:
         self.spawn_timer = 0
         self.tower_boost_timer = 0
         self.freeze_timer = 0
-        self.ui = UI(self)
-        self.last_pellet_regen_time = 0
-        self.last_powerup_regen_time = 0
+        self.ui = UI(self) if screen else None
+        self.atlas = SpriteAtlas() if screen else None
+        self.camera = None
+        self.chunks = None
+        self.background = None
+        self.background_key = None
+        self.dirty_rects = None
+        self.tick = 0  # simulation clock: every timer counts fixed steps of 1 / Constants.FPS seconds
+        self.timestep = FixedTimestep()
+        self.last_pellet_regen_tick = 0
+        self.last_powerup_regen_tick = 0
         self.last_menu_arrow = 0
         self.max_base_health = 100
 
+    def set_menu_params(self, params):
+        for param, value in params.items():
+            if isinstance(self.menu_params[param], list):
+                self.menu_params[param][0] = value
+            else:
+                self.menu_params[param] = value
+
     def start_game(self):
-        self.maze = Maze(self.menu_params['width'][0], self.menu_params['height'][0], self.menu_params['spawns'])
-        global screen
-        screen = pygame.display.set_mode((Constants.SCREEN_WIDTH, self.maze.height * Constants.TILE_SIZE + 60))
+        width, height, spawns = self.menu_params['width'][0], self.menu_params['height'][0], self.menu_params['spawns']
+        if self.maze:
+            self.maze.close()
+        self.maze = self.maze_library and self.maze_library.pick(width, height, spawns, self.rng.maze)
+        if self.maze is None:
+            self.maze = Maze(width, height, spawns, self.rng.maze.getrandbits(32))
+        self.maze.path_service = PathService(self.maze, self.path_budget_us, self.path_workers)
+        self.maze.path_service.prepare()
+        # on a thread when replays do not depend on it, since enemies search paths until it is ready
+        self.maze.build_next_hops(background=self.path_budget_us is not None or self.path_workers > 0)
+        if self.screen:
+            view_height = min(self.maze.height * Constants.TILE_SIZE, Constants.SCREEN_HEIGHT - 60)
+            self.screen = pygame.display.set_mode((Constants.SCREEN_WIDTH, view_height + 60))
+            self.camera = Camera(self.maze, Constants.SCREEN_WIDTH, view_height)
+            self.chunks = MazeChunks(self.maze, self.atlas)
+            self.background = pygame.Surface((Constants.SCREEN_WIDTH, view_height))
+            self.background_key = None
+            self.dirty_rects = None
         self.player = Player(self.maze)
-        self.enemies = []
+        for enemy in self.enemies:
+            self.enemy_pool.release(enemy)
+        for proj in self.projectiles:
+            self.projectile_pool.release(proj)
+        if self.vectorized:
+            self.entity_store = EntityStore(enemy_pool=self.enemy_pool, projectile_pool=self.projectile_pool)
+            self.enemies = self.entity_store.enemies
+            self.projectiles = self.entity_store.projectiles
+        else:
+            self.enemies = []
+            self.projectiles = []
+        self.enemy_index = TileIndex(self.maze.width, self.maze.height)
         self.towers = []
-        self.projectiles = []
+        self.tower_scheduler = TowerScheduler(self.maze.width, self.maze.height)
         self.base_health = 100
         self.score = 0
         self.wave_number = 1
@@ -83,67 +127,205 @@ class Game:
         self.total_enemies = self.menu_params['enemies']
         self.wave_timer = 20 * Constants.FPS
         self.state = 'playing'
-        self.last_pellet_regen_time = pygame.time.get_ticks()
-        self.last_powerup_regen_time = pygame.time.get_ticks()
+        self.last_pellet_regen_tick = self.tick
+        self.last_powerup_regen_tick = self.tick
+
+    def visible_towers(self):
+        if self.camera.covers_maze:
+            return self.towers
+        return self.maze.occupancy.towers_in(*self.camera.tile_range())
+
+    def visible_enemies(self):
+        if self.camera.covers_maze:
+            return self.enemies
+        if self.entity_store:
+            camera = self.camera
+            return self.entity_store.enemies_in_rect(camera.x - Constants.TILE_SIZE, camera.y - Constants.TILE_SIZE,
+                                                     camera.x + camera.width + Constants.TILE_SIZE,
+                                                     camera.y + camera.height + Constants.TILE_SIZE)
+        return self.enemy_index.query_tiles(*self.camera.tile_range(margin=1))
 
     def draw(self, screen_, time):
-        screen_.fill(Colors.BLACK)
+        """draw a frame; returns the dirty rects to update, or None when the whole screen changed"""
+        if self.state == 'menu':
+            self.ui.draw_menu(screen_)
+            self.dirty_rects = None
+            return None
+        camera = self.camera
+        camera.follow((self.player.pos[0] + self.player.w // 2, self.player.pos[1] + self.player.h // 2))
+        boosted = self.tower_boost_timer > 0
+        background_key = (camera.x, camera.y, self.maze.items_version, self.towers_version, boosted)
+        full_redraw = self.state != 'playing' or self.dirty_rects is None or self.background_key != background_key \
+            or self.too_dirty(self.dirty_rects)
+        if self.background_key != background_key:
+            self.chunks.draw(self.background, camera, self.towers_version, boosted)
+            self.background_key = background_key
+        if full_redraw:
+            screen_.fill(Colors.BLACK)
+            screen_.blit(self.background, (0, 0))
+        else:
+            for rect in self.dirty_rects:
+                screen_.blit(self.background, rect, rect)
+
         half_tile_size = Constants.TILE_SIZE // 2
-        for wall in self.maze.wall_rects:
-            pygame.draw.rect(screen_, Colors.WHITE, wall)
-        for wall in self.maze.one_way_walls:
-            draw_one_way_wall(screen_, *wall)
-        for pellet in self.maze.pellets:
-            pygame.draw.rect(screen_, Colors.YELLOW, (pellet[0] * Constants.TILE_SIZE + 14, pellet[1] * Constants.TILE_SIZE + 14, 4, 4))
-        for powerup in self.maze.powerups:
-            pygame.draw.circle(screen_, Colors.PURPLE, (powerup[0] * Constants.TILE_SIZE + half_tile_size, powerup[1] * Constants.TILE_SIZE + half_tile_size), 5)
-        for spawn in self.maze.spawn_points:
-            pygame.draw.rect(screen_, Colors.DARK_RED, (spawn[0] * Constants.TILE_SIZE + 1, spawn[1] * Constants.TILE_SIZE + 1, Constants.TILE_SIZE - 2, Constants.TILE_SIZE - 2))
-
-        pygame.draw.rect(screen_, Colors.LIGHT_BLUE, (self.maze.base[0] * Constants.TILE_SIZE, self.maze.base[1] * Constants.TILE_SIZE, Constants.TILE_SIZE - 2, Constants.TILE_SIZE - 2))
         base_x, base_y = self.maze.base
         base_center_x = base_x * Constants.TILE_SIZE + half_tile_size
         base_center_y = base_y * Constants.TILE_SIZE + half_tile_size
-        ratio = self.base_health / self.max_base_health
-        color = Colors.GREEN if ratio > 0.5 else Colors.YELLOW if ratio > 0.25 else Colors.RED
-        bar_width = int(24 * ratio)
-        pygame.draw.rect(screen_, color, (base_center_x - 12, base_center_y + 14, bar_width, 4))
-        pygame.draw.rect(screen_, Colors.BLACK, (base_center_x - 12, base_center_y + 14, 24, 4), 1)
-
-        for tower in self.towers:
-            tower.draw(screen_, time, self.tower_boost_timer)
-        for enemy in self.enemies:
-            enemy.draw(screen_, time)
+        dirty = [screen_.blit(self.atlas.health_bar(self.base_health / self.max_base_health),
+                              (base_center_x - 12 - camera.x, base_center_y + 14 - camera.y))]
+
+        blit_sequence = []
+        for tower in self.visible_towers():
+            blit_sequence.extend(tower.sprites(self.atlas, time, self.tick))
+        for enemy in self.visible_enemies():
+            blit_sequence.extend(enemy.sprites(self.atlas, time))
+        dirty.extend(screen_.blits(camera.to_screen(blit_sequence)))
         for proj in self.projectiles:
-            proj.draw(screen_)
-        self.player.draw(screen_, time)
-        if self.state == 'menu':
-            self.ui.draw_menu(screen_)
-        elif self.state == 'playing':
+            if camera.contains(proj.pos, margin=10):
+                dirty.append(proj.draw(screen_, (camera.x, camera.y)))
+        dirty.extend(screen_.blits(camera.to_screen(self.player.sprites(self.atlas, time))))
+        if self.state == 'playing':
+            hud_rect = pygame.Rect(0, camera.height, Constants.SCREEN_WIDTH, 60)
+            screen_.fill(Colors.BLACK, hud_rect)
             self.ui.draw_hud(screen_)
+            dirty.append(hud_rect)
         elif self.state == 'game_over':
             self.ui.draw_game_over(screen_)
 
+        if full_redraw:
+            self.dirty_rects = None if self.state != 'playing' else dirty
+            return None
+        updated = self.dirty_rects + dirty
+        self.dirty_rects = dirty
+        if self.too_dirty(dirty):
+            return None  # and the next frame repaints in full
+        return updated
+
+    def too_dirty(self, rects):
+        return len(rects) > self.MAX_DIRTY_RECTS or sum(rect.w * rect.h for rect in rects) > self.MAX_DIRTY_AREA
+
+    def add_enemy(self, enemy):
+        if self.entity_store:
+            self.entity_store.add_enemy(enemy)
+        else:
+            enemy.slot = len(self.enemies)
+            self.enemies.append(enemy)
+
+    def remove_enemy(self, enemy):
+        """drop a dead enemy from the per-object lists and return it to its pool"""
+        self.enemy_index.remove(enemy)
+        swap_remove(self.enemies, enemy.slot)
+        self.enemy_pool.release(enemy)
+
+    def add_tower(self, tower):
+        self.towers.append(tower)
+        self.maze.occupancy.add_tower((tower.x, tower.y), tower)
+        self.tower_scheduler.add(tower)
+        self.towers_version += 1
+
+    def upgrade_tower(self, tower):
+        tower.upgrade()
+        self.tower_scheduler.upgraded(tower)
+        self.towers_version += 1
+
+    def occupied_tiles(self):
+        """indices of the tiles with an enemy on them"""
+        if self.entity_store:
+            return self.entity_store.occupied_tiles(self.maze.width, self.maze.height)
+        return [tile for tile, bucket in self.enemy_index.buckets.items() if bucket]
+
+    def update_towers(self):
+        scheduler = self.tower_scheduler
+        if not scheduler.advance(self.tick) or not self.enemies:
+            return
+        boosted = self.tower_boost_timer > 0
+        woken = scheduler.woken(self.occupied_tiles(), boosted)
+        if not woken:
+            return
+        radii = [tower.base_range * (1.5 if boosted else 1) for tower in woken]
+        half_tile_size = Constants.TILE_SIZE // 2
+        base_center = (self.maze.base[0] * Constants.TILE_SIZE + half_tile_size,
+                       self.maze.base[1] * Constants.TILE_SIZE + half_tile_size)
+        if self.entity_store:
+            targets = self.entity_store.find_targets([tower.center() for tower in woken], radii, base_center,
+                                                     self.maze.width, self.maze.height)
+        else:
+            targets = [tower.find_target(self, radius, base_center) for tower, radius in zip(woken, radii)]
+        # a shot only launches a projectile, so no tower's choice depends on another's
+        for tower, target in zip(woken, targets):
+            if target:
+                self.add_projectile(tower.shoot(self, target, self.tick))
+                scheduler.fired(tower)
+
+    def add_projectile(self, proj):
+        if self.entity_store:
+            self.entity_store.add_projectile(proj)
+        else:
+            proj.slot = len(self.projectiles)
+            self.projectiles.append(proj)
+
     def get_empty_cells(self):
-        empty = []
-        for y in range(self.maze.height):
-            for x in range(self.maze.width):
-                if (x, y) not in self.maze.spawn_points and (x, y) != self.maze.base and \
-                        (x, y) not in self.maze.pellets and (x, y) not in self.maze.powerups and \
-                        not any(t.x == x and t.y == y for t in self.towers):
-                    empty.append((x, y))
-        return empty
+        return self.maze.occupancy.free_tiles()
+
+    def entity_counts(self):
+        return {'enemies': len(self.enemies), 'projectiles': len(self.projectiles), 'towers': len(self.towers),
+                'pellets': len(self.maze.pellets) if self.maze else 0,
+                'path_queue': len(self.maze.path_service.pending) if self.maze else 0,
+                'dirty_rects': len(self.dirty_rects) if self.dirty_rects else 0}
 
     async def update(self):
+        """one pass of the main loop: handle input, run the simulation ticks that are due and render if any ran"""
+        prof = self.profiler
+        if prof:
+            prof.start_frame()
         time = pygame.time.get_ticks()
         keys = pygame.key.get_pressed()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return False
+            if prof and event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    self.show_profiler = not self.show_profiler
+                    self.dirty_rects = None
+                elif event.key == pygame.K_F4:
+                    prof.export(f"profile-{time}.json")
+        if prof:
+            prof.lap('events')
+
+        due = self.timestep.advance()
+        for _ in range(due):
+            if not self.step(keys):
+                return False
+            if self.recorder:
+                self.recorder.record(keys)
+        if not due:
+            if prof:
+                prof.discard_frame()
+            return True  # woke up before the next tick; nothing new to draw
+        dirty_rects = self.draw(self.screen, time)
+        if self.show_profiler and self.state == 'playing':
+            overlay = self.ui.draw_profiler(self.screen, prof)
+            if dirty_rects is not None:
+                dirty_rects.append(overlay)
+            if self.dirty_rects is not None:
+                self.dirty_rects.append(overlay)  # restored under the next frame's overlay
+        if prof:
+            prof.lap('draw')
+        if dirty_rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty_rects)
+        if prof:
+            prof.lap('flip')
+            prof.end_frame(self.entity_counts())
+        return True
 
+    def step(self, keys):
+        """advance the game state by one tick; returns False when the player quits"""
+        self.tick += 1
         if self.state == 'menu':
             if keys[pygame.K_UP] or keys[pygame.K_DOWN] or keys[pygame.K_LEFT] or keys[pygame.K_RIGHT]:
-                if time - self.last_menu_arrow >= 200:
+                if self.tick - self.last_menu_arrow >= Constants.FPS // 5:
                     if keys[pygame.K_UP]:
                         self.menu_select = (self.menu_select - 1) % len(self.menu_params)
                     elif keys[pygame.K_DOWN]:
@@ -159,48 +341,74 @@ class Game:
                             self.menu_params[param] = max(0, self.menu_params[param] + delta)
                         elif param == 'enemies':
                             self.menu_params[param] = max(2, self.menu_params[param] + delta)
-                    self.last_menu_arrow = time
+                    self.last_menu_arrow = self.tick
             elif keys[pygame.K_RETURN]:
                 self.start_game()
             elif keys[pygame.K_q]:
                 return False
 
         elif self.state == 'playing':
+            prof = self.profiler
             if keys[pygame.K_ESCAPE]:
                 self.state = 'game_over'
             else:
-                self.player.update(keys, self, time)
+                self.player.update(keys, self)
+                if prof:
+                    prof.lap('player')
                 if self.wave_timer > 0:
                     self.wave_timer -= 1
                 elif self.enemies or (self.menu_params['waves'] == 0 or self.wave_number <= self.menu_params['waves']):
                     spawn_rate = [4, 3, 2, 1, 0.5, 0.25][min(self.wave_number - 1, 5)] * Constants.FPS
                     self.spawn_timer -= 1
                     if self.spawn_timer <= 0 and self.spawned_enemies < self.total_enemies:
-                        behavior = random.choice(['chase', 'shortest', 'random_path'])
-                        spawn = random.choice(self.maze.spawn_points)
-                        self.enemies.append(Enemy(spawn, behavior, self.maze, self.wave_number))
+                        behavior = self.rng.spawns.choice(['chase', 'shortest', 'random_path'])
+                        spawn = self.rng.spawns.choice(self.maze.spawn_points)
+                        self.add_enemy(self.enemy_pool.acquire(spawn, behavior, self.maze, self.wave_number, self.rng.enemies))
                         self.spawned_enemies += 1
                         self.spawn_timer = spawn_rate
+                if prof:
+                    prof.lap('spawning')
 
-                i = 0
-                while i < len(self.enemies):
-                    if self.enemies[i].update(self.player, self):
-                        del self.enemies[i]
-                        self.destroyed_enemies += 1
-                    else:
-                        i += 1
-
-                for tower in self.towers:
-                    proj = tower.update(self.enemies, self, time)
-                    if proj:
-                        self.projectiles.append(proj)
-
-                i = 0
-                while i < len(self.projectiles):
-                    if self.projectiles[i].update(self.enemies, self):
-                        del self.projectiles[i]
-                    else:
-                        i += 1
+                self.maze.path_service.process()
+                if prof:
+                    prof.lap('paths')
+
+                if self.entity_store:
+                    self.entity_store.update_enemies(self)
+                else:
+                    i = 0
+                    while i < len(self.enemies):
+                        if self.enemies[i].update(self.player, self):
+                            # the last enemy moves into slot i and is updated next
+                            self.enemy_pool.release(swap_remove(self.enemies, i))
+                            self.destroyed_enemies += 1
+                        else:
+                            i += 1
+                    self.enemy_index.rebuild(self.enemies)
+                    player_center = (self.player.pos[0] + self.player.w // 2, self.player.pos[1] + self.player.h // 2)
+                    for enemy in list(self.enemy_index.query_radius(*player_center, 14)):
+                        if enemy.touches_player(self.player):
+                            enemy.hit_player(self.player, self)
+                            self.remove_enemy(enemy)
+                            self.destroyed_enemies += 1
+                if prof:
+                    prof.lap('enemies')
+
+                self.update_towers()
+                if prof:
+                    prof.lap('towers')
+
+                if self.entity_store:
+                    self.entity_store.update_projectiles(self)
+                else:
+                    i = 0
+                    while i < len(self.projectiles):
+                        if self.projectiles[i].update(self.enemies, self):
+                            self.projectile_pool.release(swap_remove(self.projectiles, i))
+                        else:
+                            i += 1
+                if prof:
+                    prof.lap('projectiles')
 
                 if self.tower_boost_timer > 0:
                     self.tower_boost_timer -= 1
@@ -217,40 +425,63 @@ class Game:
 
                 if self.base_health <= 0 or (self.wave_number > self.menu_params['waves'] > 0):
                     self.state = 'game_over'
+                if prof:
+                    prof.lap('waves')
 
-                current_time = pygame.time.get_ticks()
-                if current_time - self.last_pellet_regen_time >= 10000:  # 10 seconds
-                    empty_cells = self.get_empty_cells()
-                    if empty_cells:
-                        x, y = random.choice(empty_cells)
-                        self.maze.pellets.append((x, y))
-                        self.last_pellet_regen_time = current_time
-                if current_time - self.last_powerup_regen_time >= 60000:  # 60 seconds
-                    empty_cells = self.get_empty_cells()
-                    if empty_cells:
-                        x, y = random.choice(empty_cells)
-                        self.maze.powerups.append((x, y))
-                        self.last_powerup_regen_time = current_time
+                if self.tick - self.last_pellet_regen_tick >= 10 * Constants.FPS:
+                    empty_cell = self.maze.occupancy.random_free(self.rng.items)
+                    if empty_cell:
+                        self.maze.add_pellet(empty_cell)
+                        self.last_pellet_regen_tick = self.tick
+                if self.tick - self.last_powerup_regen_tick >= 60 * Constants.FPS:
+                    empty_cell = self.maze.occupancy.random_free(self.rng.items)
+                    if empty_cell:
+                        self.maze.add_powerup(empty_cell)
+                        self.last_powerup_regen_tick = self.tick
+                if prof:
+                    prof.lap('regen')
 
         elif self.state == 'game_over':
             if keys[pygame.K_m]:
                 self.state = 'menu'
             elif keys[pygame.K_q]:
                 return False
-
-        self.draw(screen, time)
-        pygame.display.flip()
         return True
 
-async def main():
-    game = Game()
+async def main(seed=None, record_path=None, profile=False, path_budget_us=Constants.PATH_BUDGET_US, path_workers=0):
+    pygame.init()
+    screen = pygame.display.set_mode((Constants.SCREEN_WIDTH, Constants.SCREEN_HEIGHT))
+    pygame.display.set_caption("Maze Defender")
+    if record_path:
+        path_budget_us, path_workers = None, 0  # a replay has to find every path on the same tick
+    game = Game(screen, vectorized=HAS_NUMPY, seed=seed, path_budget_us=path_budget_us, path_workers=path_workers)
+    if record_path:
+        from replay import Recorder
+        game.recorder = Recorder(game)
+    if profile:
+        game.profiler = FrameProfiler()
     running = True
     while running:
         running = await game.update()
-        await asyncio.sleep(1 / Constants.FPS)
+        await asyncio.sleep(game.timestep.time_to_next_tick())
+    if game.maze:
+        game.maze.close()
+    if record_path:
+        game.recorder.recording.save(record_path)
 
 if platform.system() == "Emscripten":
     asyncio.ensure_future(main())
 else:
     if __name__ == "__main__":
-        asyncio.run(main())
+        import argparse
+        parser = argparse.ArgumentParser(description="Play Maze Defender")
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--record', help="save the session's input to this file for replay.py")
+        parser.add_argument('--profile', action='store_true',
+                            help="time each frame phase; F3 toggles the overlay, F4 writes profile-<ms>.json")
+        parser.add_argument('--path-budget-us', type=int, default=Constants.PATH_BUDGET_US,
+                            help="microseconds per tick spent on queued enemy pathfinding")
+        parser.add_argument('--path-workers', type=int, default=0,
+                            help="search enemy paths in this many background processes instead")
+        args = parser.parse_args()
+        asyncio.run(main(args.seed, args.record, args.profile, args.path_budget_us, args.path_workers))
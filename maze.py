@@ -1,117 +1,332 @@
 # maze.py
 import random
+import struct
+import time
 import pygame
-from utils import Constants
+from corridors import CorridorGraph
+from next_hops import NextHopTable
+from occupancy import Occupancy
+from pathfinding import PathService
+from utils import Constants, Directions, FlowField, PathCache
+
+# serialized layout: header, spawn tiles, powerup cell indices, cells packed two 4-bit masks per byte,
+# then a pellet bitmap with one bit per cell
+MAZE_HEADER = struct.Struct('<4sHHIHHBI')  # magic, width, height, seed, base x, base y, spawn count, powerup count
+MAZE_MAGIC = b'MZD1'
+LOW_NIBBLE = bytes(value & 0x0F for value in range(256))
+HIGH_NIBBLE = bytes(value >> 4 for value in range(256))
+PELLET_BITS = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]
 
 class Maze:
-    def __init__(self, width, height, num_spawns):
-        self.width = width
-        self.height = height
-        self.grid = [[set() for _ in range(width)] for _ in range(height)]
-        self.generate_maze()
-        self.remove_dead_ends()
+    def __init__(self, width, height, num_spawns, seed=None):
+        # every random choice made while building comes from the seed, so a maze can be stored as its seed
+        self.setup(width, height, random.getrandbits(32) if seed is None else seed)
+        self.timed('generate_maze', self.generate_maze)
+        self.timed('remove_dead_ends', self.remove_dead_ends)
         self.spawn_points = self.place_spawns(num_spawns)
         self.base = self.place_base()
-        self.pellets = self.place_pellets()
-        self.powerups = self.place_powerups()
-        self.wall_rects = self.generate_wall_rects()
-        self.one_way_walls = self.get_one_way_walls()
+        self.timed('place_pellets', self.place_pellets)
+        self.place_powerups()
+        self.corridor_graph_cache = self.timed('corridor_graph', CorridorGraph, self)
 
-    def generate_maze(self):
-        visited = set()
-        stack = []
+    def setup(self, width, height, seed):
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.cells = bytearray(width * height)  # Directions mask per cell, indexed by y * width + x
+        self.grid_version = 0
+        self.path_cache = PathCache()
+        self.path_service = PathService(self)  # answers at once until the game gives it a budget
+        self.timings = {}  # seconds spent in each construction phase
+        self.occupancy = Occupancy(width, height)
+        self.spawn_points = []
+        self.base = None
+        self.flow_field_cache = None
+        self.corridor_graph_cache = None
+        self.next_hops = None  # NextHopTable, once build_next_hops has been called on a small enough maze
+        self.items_version = 0  # bumped whenever pellets or powerups are added or collected
+        self.pellets = set()
+        self.powerups = set()
+
+    @property
+    def flow_field(self):
+        # built on first use so loading a stored maze stays cheap
+        if self.flow_field_cache is None:
+            self.flow_field_cache = self.timed('flow_field', FlowField, self, self.base)
+        return self.flow_field_cache
+
+    @property
+    def corridor_graph(self):
+        # generated mazes build it up front; loaded ones on their first path request
+        if self.corridor_graph_cache is None:
+            self.corridor_graph_cache = self.timed('corridor_graph', CorridorGraph, self)
+        return self.corridor_graph_cache
+
+    def to_bytes(self):
+        size = self.width * self.height
+        header = MAZE_HEADER.pack(MAZE_MAGIC, self.width, self.height, self.seed, self.base[0], self.base[1],
+                                  len(self.spawn_points), len(self.powerups))
+        spawns = b''.join(struct.pack('<HH', *spawn) for spawn in self.spawn_points)
+        powerups = struct.pack(f'<{len(self.powerups)}I', *sorted(y * self.width + x for x, y in self.powerups))
+        # every mask is below 16, so shifting the odd cells as one integer moves each into its byte's high nibble
+        even, odd = bytes(self.cells[0::2]), bytes(self.cells[1::2])
+        packed = (int.from_bytes(even, 'little') | int.from_bytes(odd, 'little') << 4).to_bytes(len(even), 'little')
+        pellets = bytearray((size + 7) // 8)
+        for x, y in self.pellets:
+            index = y * self.width + x
+            pellets[index >> 3] |= 1 << (index & 7)
+        return header + spawns + powerups + packed + pellets
+
+    @classmethod
+    def from_bytes(cls, data):
+        """rebuild a maze written by to_bytes; data may be any buffer, such as a slice of an mmap"""
+        data = memoryview(data)
+        magic, width, height, seed, base_x, base_y, num_spawns, num_powerups = MAZE_HEADER.unpack_from(data)
+        if magic != MAZE_MAGIC:
+            raise ValueError("not a serialized maze")
+        maze = cls.__new__(cls)
+        maze.setup(width, height, seed)
+        size = width * height
+        offset = MAZE_HEADER.size
+        maze.spawn_points = [struct.unpack_from('<HH', data, offset + 4 * i) for i in range(num_spawns)]
+        offset += 4 * num_spawns
+        powerups = struct.unpack_from(f'<{num_powerups}I', data, offset)
+        offset += 4 * num_powerups
+        packed = bytes(data[offset:offset + (size + 1) // 2])
+        offset += len(packed)
+        maze.cells[0::2] = packed.translate(LOW_NIBBLE)
+        maze.cells[1::2] = packed.translate(HIGH_NIBBLE)[:size // 2]
+        for spawn in maze.spawn_points:
+            maze.occupancy.add(spawn, Occupancy.SPAWN)
+        maze.base = base_x, base_y
+        maze.occupancy.add(maze.base, Occupancy.BASE)
+        pellet_bytes = bytes(data[offset:offset + (size + 7) // 8])
+        pellets = bytearray(len(pellet_bytes) * 8)
+        for bit, table in enumerate(PELLET_BITS):
+            pellets[bit::8] = pellet_bytes.translate(table)
+        index = pellets.find(1)
+        while index >= 0:
+            maze.add_pellet((index % width, index // width))
+            index = pellets.find(1, index + 1)
+        for index in powerups:
+            maze.add_powerup((index % width, index // width))
+        maze.items_version = 0
+        return maze
+
+    def timed(self, phase, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        self.timings[phase] = time.perf_counter() - started
+        return result
 
-        start_x, start_y = random.randint(0, self.width - 1), random.randint(0, self.height - 1)
-        visited.add((start_x, start_y))
-        stack.append((start_x, start_y))
+    def grid_changed(self):
+        # call after editing self.cells so cached paths and the flow field follow the new layout
+        self.grid_version += 1
+        self.flow_field_cache = None
+        self.corridor_graph_cache = None
+        if self.next_hops is not None:
+            self.next_hops.stop()
+            self.next_hops = None
+
+    def close(self):
+        """stop the work a discarded maze may still have running: path workers and a next-hop build"""
+        self.path_service.close()
+        if self.next_hops is not None:
+            self.next_hops.stop()
+
+    def build_next_hops(self, background=False):
+        """all-pairs next steps for mazes small enough to afford them; bigger ones keep searching paths"""
+        if self.width * self.height <= NextHopTable.MAX_CELLS:
+            self.next_hops = NextHopTable(self)
+            self.timed('next_hops', self.next_hops.start, background)
+
+    def request_path(self, start, goal):
+        """the path from start to goal through path_service, or None while it is still being searched for"""
+        return self.path_service.request(start, goal)
+
+    def add_pellet(self, tile):
+        self.pellets.add(tile)
+        self.occupancy.add(tile, Occupancy.PELLET)
+        self.items_version += 1
+
+    def remove_pellet(self, tile):
+        self.pellets.discard(tile)
+        self.occupancy.remove(tile, Occupancy.PELLET)
+        self.items_version += 1
+
+    def add_powerup(self, tile):
+        self.powerups.add(tile)
+        self.occupancy.add(tile, Occupancy.POWERUP)
+        self.items_version += 1
+
+    def remove_powerup(self, tile):
+        self.powerups.discard(tile)
+        self.occupancy.remove(tile, Occupancy.POWERUP)
+        self.items_version += 1
+
+    def generate_maze(self):
+        # iterative depth-first search over cell indices
+        width, size, cells = self.width, self.width * self.height, self.cells
+        visited = bytearray(size)
+        rand = self.rng.random
+        start = self.rng.randrange(size)
+        visited[start] = 1
+        stack = [start]
 
         while stack:
-            x, y = stack[-1]
-            neighbors = [(nx, ny, d, o) for nx, ny, d, o in
-                         [(x - 1, y, 'W', 'E'), (x + 1, y, 'E', 'W'), (x, y - 1, 'N', 'S'), (x, y + 1, 'S', 'N')]
-                         if 0 <= nx < self.width and 0 <= ny < self.height and (nx, ny) not in visited]
+            current = stack[-1]
+            x = current % width
+            neighbors = []
+            if x > 0 and not visited[current - 1]:
+                neighbors.append((current - 1, Directions.W, Directions.E))
+            if x < width - 1 and not visited[current + 1]:
+                neighbors.append((current + 1, Directions.E, Directions.W))
+            if current >= width and not visited[current - width]:
+                neighbors.append((current - width, Directions.N, Directions.S))
+            if current + width < size and not visited[current + width]:
+                neighbors.append((current + width, Directions.S, Directions.N))
             if neighbors:
-                nx, ny, dir_, opp = random.choice(neighbors)
-                self.grid[y][x].add(dir_)
-                self.grid[ny][nx].add(opp)
-                visited.add((nx, ny))
-                stack.append((nx, ny))
+                neighbor, dir_, opp = neighbors[int(rand() * len(neighbors))]
+                cells[current] |= dir_
+                cells[neighbor] |= opp
+                visited[neighbor] = 1
+                stack.append(neighbor)
             else:
                 stack.pop()
 
     def remove_dead_ends(self):
+        # carving out of a dead end never creates a new one, so a single worklist pass is enough
         ONE_WAY_PROB = 0.3
-        previous_dead_ends = set()
-        while True:
-            dead_ends = [(x, y) for y in range(self.height) for x in range(self.width) if len(self.grid[y][x]) == 1]
-            if not dead_ends or set(dead_ends) == previous_dead_ends:
-                break
-            previous_dead_ends = set(dead_ends)
-            for x, y in dead_ends:
-                dirs = [(nx, ny, d, o) for nx, ny, d, o in
-                        [(x - 1, y, 'W', 'E'), (x + 1, y, 'E', 'W'), (x, y - 1, 'N', 'S'), (x, y + 1, 'S', 'N')]
-                        if 0 <= nx < self.width and 0 <= ny < self.height and d not in self.grid[y][x]]
-                if dirs:
-                    nx, ny, dir_, opp = random.choice(dirs)
-                    if random.random() < ONE_WAY_PROB:
-                        self.grid[y][x].add(dir_)  # One-way from (x,y) to (nx,ny)
-                    else:
-                        self.grid[y][x].add(dir_)
-                        self.grid[ny][nx].add(opp)  # Two-way connection
+        width, size, cells = self.width, self.width * self.height, self.cells
+        dead_end_masks = (Directions.N, Directions.E, Directions.S, Directions.W)
+        worklist = [i for i, mask in enumerate(cells) if mask in dead_end_masks]
+        for current in worklist:
+            mask = cells[current]
+            if mask not in dead_end_masks:
+                continue  # opened up by a neighbour's two-way passage since it was queued
+            x = current % width
+            dirs = []
+            if x > 0 and not mask & Directions.W:
+                dirs.append((current - 1, Directions.W, Directions.E))
+            if x < width - 1 and not mask & Directions.E:
+                dirs.append((current + 1, Directions.E, Directions.W))
+            if current >= width and not mask & Directions.N:
+                dirs.append((current - width, Directions.N, Directions.S))
+            if current + width < size and not mask & Directions.S:
+                dirs.append((current + width, Directions.S, Directions.N))
+            if dirs:
+                neighbor, dir_, opp = self.rng.choice(dirs)
+                if self.rng.random() < ONE_WAY_PROB:
+                    cells[current] |= dir_  # One-way from current to neighbor
+                else:
+                    cells[current] |= dir_
+                    cells[neighbor] |= opp  # Two-way connection
 
     def place_spawns(self, num):
-        return random.sample([(0, y) for y in range(self.height)], min(num, self.height))
+        spawns = self.rng.sample([(0, y) for y in range(self.height)], min(num, self.height))
+        for spawn in spawns:
+            self.occupancy.add(spawn, Occupancy.SPAWN)
+        return spawns
 
     def place_base(self):
-        return self.width - 1, random.randint(0, self.height - 1)
+        base = self.width - 1, self.rng.randint(0, self.height - 1)
+        self.occupancy.add(base, Occupancy.BASE)
+        return base
 
     def place_pellets(self):
-        pellets = []
-        for y in range(self.height):
-            for x in range(self.width):
-                if (x, y) not in self.spawn_points and (x, y) != self.base and random.random() < 0.2:
-                    pellets.append((x, y))
-        return pellets
+        rand = self.rng.random
+        flags = self.occupancy.flags
+        for index in range(self.width * self.height):
+            if not flags[index] and rand() < 0.2:
+                self.add_pellet((index % self.width, index // self.width))
 
     def place_powerups(self):
-        powerups = []
         for _ in range(5):
-            while True:
-                x, y = random.randint(0, self.width - 1), random.randint(0, self.height - 1)
-                if (x, y) not in self.spawn_points and (x, y) != self.base and (x, y) not in self.pellets:
-                    powerups.append((x, y))
-                    break
-        return powerups
-
-    def generate_wall_rects(self):
+            tile = self.occupancy.random_free(self.rng)
+            if tile:
+                self.add_powerup(tile)
+
+    def generate_wall_rects(self, min_x=0, min_y=0, max_x=None, max_y=None):
+        """solid walls bordering the tiles in the inclusive range, the whole maze by default"""
+        max_x = self.width - 1 if max_x is None else max_x
+        max_y = self.height - 1 if max_y is None else max_y
         walls = [
             pygame.Rect(0, 0, self.width * Constants.TILE_SIZE, 2),
             pygame.Rect(0, self.height * Constants.TILE_SIZE - 2, self.width * Constants.TILE_SIZE, 2),
             pygame.Rect(0, 0, 2, self.height * Constants.TILE_SIZE),
             pygame.Rect(self.width * Constants.TILE_SIZE - 2, 0, 2, self.height * Constants.TILE_SIZE)
         ]
-        for y in range(self.height):
-            for x in range(self.width - 1):
-                if 'E' not in self.grid[y][x] and 'W' not in self.grid[y][x + 1]:
-                    walls.append(pygame.Rect((x + 1) * Constants.TILE_SIZE - 1, y * Constants.TILE_SIZE, 2, Constants.TILE_SIZE))
-        for y in range(self.height - 1):
-            for x in range(self.width):
-                if 'S' not in self.grid[y][x] and 'N' not in self.grid[y + 1][x]:
-                    walls.append(pygame.Rect(x * Constants.TILE_SIZE, (y + 1) * Constants.TILE_SIZE - 1, Constants.TILE_SIZE, 2))
+        # adjacent segments along the same grid line are merged into one rect
+        cells, width, tile = self.cells, self.width, Constants.TILE_SIZE
+        for x in range(max(min_x - 1, 0), min(max_x, width - 2) + 1):
+            run_start = None
+            for y in range(min_y, max_y + 2):
+                i = y * width + x
+                solid = y <= max_y and not cells[i] & Directions.E and not cells[i + 1] & Directions.W
+                if solid and run_start is None:
+                    run_start = y
+                elif not solid and run_start is not None:
+                    walls.append(pygame.Rect((x + 1) * tile - 1, run_start * tile, 2, (y - run_start) * tile))
+                    run_start = None
+        for y in range(max(min_y - 1, 0), min(max_y, self.height - 2) + 1):
+            run_start = None
+            for x in range(min_x, max_x + 2):
+                i = y * width + x
+                solid = x <= max_x and not cells[i] & Directions.S and not cells[i + width] & Directions.N
+                if solid and run_start is None:
+                    run_start = x
+                elif not solid and run_start is not None:
+                    walls.append(pygame.Rect(run_start * tile, (y + 1) * tile - 1, (x - run_start) * tile, 2))
+                    run_start = None
         return walls
 
-    def get_one_way_walls(self):
+    def collides(self, rect):
+        """whether rect overlaps a solid wall, checked against the walls of the tiles it covers only"""
+        tile = Constants.TILE_SIZE
+        left, top, right, bottom = rect.left, rect.top, rect.right, rect.bottom
+        if left < 2 or top < 2 or right > self.width * tile - 2 or bottom > self.height * tile - 2:
+            return True  # outer border
+        cells, width = self.cells, self.width
+        x0, x1 = left // tile, (right - 1) // tile
+        y0, y1 = top // tile, (bottom - 1) // tile
+        # the wall between columns x and x + 1 covers pixels (x + 1) * tile - 1 and (x + 1) * tile
+        for x in range(max(x0 - 1, 0), min(x1, width - 2) + 1):
+            wall_x = (x + 1) * tile - 1
+            if left < wall_x + 2 and wall_x < right:
+                for y in range(y0, y1 + 1):
+                    i = y * width + x
+                    if not cells[i] & Directions.E and not cells[i + 1] & Directions.W:
+                        return True
+        for y in range(max(y0 - 1, 0), min(y1, self.height - 2) + 1):
+            wall_y = (y + 1) * tile - 1
+            if top < wall_y + 2 and wall_y < bottom:
+                for x in range(x0, x1 + 1):
+                    i = y * width + x
+                    if not cells[i] & Directions.S and not cells[i + width] & Directions.N:
+                        return True
+        return False
+
+    def get_one_way_walls(self, min_x=0, min_y=0, max_x=None, max_y=None):
+        """one-way walls bordering the tiles in the inclusive range, the whole maze by default"""
+        max_x = self.width - 1 if max_x is None else max_x
+        max_y = self.height - 1 if max_y is None else max_y
         one_way_walls = []
-        for y in range(self.height):
-            for x in range(self.width - 1):
-                if 'E' in self.grid[y][x] and 'W' not in self.grid[y][x + 1]:
+        cells = self.cells
+        for y in range(min_y, max_y + 1):
+            for x in range(max(min_x - 1, 0), min(max_x, self.width - 2) + 1):
+                i = y * self.width + x
+                east, west = cells[i] & Directions.E, cells[i + 1] & Directions.W
+                if east and not west:
                     one_way_walls.append(('vertical', x, y, 'east'))
-                elif 'W' in self.grid[y][x + 1] and 'E' not in self.grid[y][x]:
+                elif west and not east:
                     one_way_walls.append(('vertical', x, y, 'west'))
-        for y in range(self.height - 1):
-            for x in range(self.width):
-                if 'S' in self.grid[y][x] and 'N' not in self.grid[y + 1][x]:
+        for y in range(max(min_y - 1, 0), min(max_y, self.height - 2) + 1):
+            for x in range(min_x, max_x + 1):
+                i = y * self.width + x
+                south, north = cells[i] & Directions.S, cells[i + self.width] & Directions.N
+                if south and not north:
                     one_way_walls.append(('horizontal', x, y, 'south'))
-                elif 'N' in self.grid[y + 1][x] and 'S' not in self.grid[y][x]:
+                elif north and not south:
                     one_way_walls.append(('horizontal', x, y, 'north'))
         return one_way_walls
@@ -0,0 +1,74 @@
+# maze_library.py
+import argparse
+import mmap
+import struct
+from maze import Maze
+
+LIBRARY_MAGIC = b'MZL1'
+LIBRARY_HEADER = struct.Struct('<4sI')  # magic, maze count
+LIBRARY_ENTRY = struct.Struct('<QIHHB')  # offset, length, width, height, spawn count
+
+def write_library(path, mazes):
+    """store serialized mazes after an index table, so readers can find one without decoding the others"""
+    records = [maze.to_bytes() for maze in mazes]
+    offset = LIBRARY_HEADER.size + LIBRARY_ENTRY.size * len(records)
+    with open(path, 'wb') as file:
+        file.write(LIBRARY_HEADER.pack(LIBRARY_MAGIC, len(records)))
+        for maze, record in zip(mazes, records):
+            file.write(LIBRARY_ENTRY.pack(offset, len(record), maze.width, maze.height, len(maze.spawn_points)))
+            offset += len(record)
+        for record in records:
+            file.write(record)
+
+
+class MazeLibrary:
+    """read-only, memory-mapped collection of pre-generated mazes, decoded one at a time on request"""
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = LIBRARY_HEADER.unpack_from(self.data)
+        if magic != LIBRARY_MAGIC:
+            raise ValueError(f"{path} is not a maze library")
+        self.entries = [LIBRARY_ENTRY.unpack_from(self.data, LIBRARY_HEADER.size + i * LIBRARY_ENTRY.size)
+                        for i in range(count)]
+        self.by_size = {}  # (width, height, spawns) -> indices of matching mazes
+        for index, (_, _, width, height, spawns) in enumerate(self.entries):
+            self.by_size.setdefault((width, height, spawns), []).append(index)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        offset, length = self.entries[index][:2]
+        return Maze.from_bytes(memoryview(self.data)[offset:offset + length])
+
+    def matching(self, width, height, num_spawns):
+        return self.by_size.get((width, height, num_spawns), [])
+
+    def pick(self, width, height, num_spawns, rng):
+        """a fresh copy of a random stored maze of this size, or None when the library has none"""
+        indices = self.matching(width, height, num_spawns)
+        return self[rng.choice(indices)] if indices else None
+
+    def close(self):
+        self.data.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate a library of mazes for fast game starts")
+    parser.add_argument('path')
+    parser.add_argument('--count', type=int, default=100, help="mazes per size")
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--width', type=int, nargs='+', default=[20])
+    parser.add_argument('--height', type=int, nargs='+', default=[15])
+    parser.add_argument('--spawns', type=int, nargs='+', default=[2])
+    args = parser.parse_args()
+
+    mazes = [Maze(width, height, spawns, seed)
+             for width in args.width for height in args.height for spawns in args.spawns
+             for seed in range(args.first_seed, args.first_seed + args.count)]
+    write_library(args.path, mazes)
+    print(f"wrote {len(mazes)} mazes to {args.path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# next_hops.py
+import threading
+from array import array
+from utils import Directions
+
+UNREACHABLE = 0xFFFF
+STEP_DX = {bit: dx for bit, dx, _, _ in Directions.STEPS}
+STEP_DY = {bit: dy for bit, _, dy, _ in Directions.STEPS}
+
+class NextHopTable:
+    """first step and distance between every pair of cells of a small maze, from one reverse BFS per cell
+
+    Entries live at [goal * size + cell]: next_step holds the Directions bit of the first step from cell
+    toward goal (0 when there is none) and distance the number of steps (UNREACHABLE when there is no way).
+    The build can run on a background thread; callers check ready before the first lookup.
+    """
+    MAX_CELLS = 1024  # 1 MB of steps and 2 MB of distances; bigger mazes keep searching paths
+
+    def __init__(self, maze):
+        self.width = maze.width
+        self.size = size = maze.width * maze.height
+        self.cells = bytes(maze.cells)  # snapshot, so a background build never reads a half-edited grid
+        self.next_step = bytearray(size * size)
+        self.distance = array('H', [UNREACHABLE]) * (size * size)
+        self.ready = False
+        self.thread = None
+        self.stopped = False
+
+    def start(self, background=False):
+        if background:
+            self.thread = threading.Thread(target=self.build, name='next-hops', daemon=True)
+            try:
+                self.thread.start()
+                return
+            except RuntimeError:  # no threads in the browser build
+                self.thread = None
+        self.build()
+
+    def stop(self):
+        """abandon a build still running on its thread, for a grid that has changed since"""
+        self.stopped = True
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def build(self):
+        width, size, cells = self.width, self.size, self.cells
+        # for every cell, the neighbours that can step into it and the bit of that step
+        predecessors = [[] for _ in range(size)]
+        for index, mask in enumerate(cells):
+            for bit, dx, dy, _ in Directions.STEPS:
+                if mask & bit:
+                    predecessors[index + dy * width + dx].append((index, bit))
+        for goal in range(size):
+            if self.stopped:
+                return
+            steps = bytearray(size)
+            distance = [UNREACHABLE] * size
+            distance[goal] = 0
+            frontier = [goal]
+            step = 0
+            while frontier:
+                step += 1
+                reached = []
+                for current in frontier:
+                    for neighbor, bit in predecessors[current]:
+                        if distance[neighbor] == UNREACHABLE:
+                            distance[neighbor] = step
+                            steps[neighbor] = bit
+                            reached.append(neighbor)
+                frontier = reached
+            row = goal * size
+            self.next_step[row:row + size] = steps
+            self.distance[row:row + size] = array('H', distance)
+        self.ready = True
+
+    def next_tile(self, start, goal):
+        """the tile one step from start toward goal, or None when goal is start or out of reach"""
+        bit = self.next_step[(goal[1] * self.width + goal[0]) * self.size + start[1] * self.width + start[0]]
+        if not bit:
+            return None
+        return (start[0] + STEP_DX[bit], start[1] + STEP_DY[bit])
+
+    def get_distance(self, start, goal):
+        """steps from start to goal, -1 when out of reach"""
+        distance = self.distance[(goal[1] * self.width + goal[0]) * self.size + start[1] * self.width + start[0]]
+        return -1 if distance == UNREACHABLE else distance
+
@@ -0,0 +1,83 @@
+# occupancy.py
+import random
+
+class Occupancy:
+    """bitmask of what occupies each maze tile, with a free-tile set kept up to date incrementally"""
+    SPAWN = 1
+    BASE = 2
+    PELLET = 4
+    POWERUP = 8
+    TOWER = 16
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.flags = bytearray(width * height)
+        # free tiles in no particular order, plus each tile's position in that list (-1 when occupied)
+        self.free = list(range(width * height))
+        self.free_slot = list(range(width * height))
+        self.towers = {}
+
+    def in_bounds(self, tile):
+        return 0 <= tile[0] < self.width and 0 <= tile[1] < self.height
+
+    def get(self, tile):
+        return self.flags[tile[1] * self.width + tile[0]]
+
+    def has(self, tile, flag):
+        return bool(self.flags[tile[1] * self.width + tile[0]] & flag)
+
+    def is_free(self, tile):
+        return not self.flags[tile[1] * self.width + tile[0]]
+
+    def add(self, tile, flag):
+        index = tile[1] * self.width + tile[0]
+        if not self.flags[index]:
+            # swap-remove from the free list
+            slot = self.free_slot[index]
+            last = self.free.pop()
+            if last != index:
+                self.free[slot] = last
+                self.free_slot[last] = slot
+            self.free_slot[index] = -1
+        self.flags[index] |= flag
+
+    def remove(self, tile, flag):
+        index = tile[1] * self.width + tile[0]
+        if not self.flags[index]:
+            return
+        self.flags[index] &= ~flag
+        if not self.flags[index]:
+            self.free_slot[index] = len(self.free)
+            self.free.append(index)
+
+    def add_tower(self, tile, tower):
+        self.towers[tile[1] * self.width + tile[0]] = tower
+        self.add(tile, Occupancy.TOWER)
+
+    def tower_at(self, tile):
+        return self.towers.get(tile[1] * self.width + tile[0])
+
+    def towers_in(self, min_x, min_y, max_x, max_y):
+        """towers on the tiles in the inclusive range"""
+        if len(self.towers) < (max_x - min_x + 1) * (max_y - min_y + 1):
+            return [tower for index, tower in self.towers.items()
+                    if min_y <= index // self.width <= max_y and min_x <= index % self.width <= max_x]
+        found = []
+        for y in range(min_y, max_y + 1):
+            row = y * self.width
+            for x in range(min_x, max_x + 1):
+                tower = self.towers.get(row + x)
+                if tower:
+                    found.append(tower)
+        return found
+
+    def free_tiles(self):
+        return [(index % self.width, index // self.width) for index in self.free]
+
+    def random_free(self, rng=random):
+        """a uniformly random unoccupied tile in O(1), or None when the maze is full"""
+        if not self.free:
+            return None
+        index = self.free[rng.randrange(len(self.free))]
+        return index % self.width, index // self.width
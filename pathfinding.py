@@ -0,0 +1,101 @@
+# pathfinding.py
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+from corridors import CorridorGraph
+
+worker_graph = None  # the maze a pool worker searches, set once per worker by init_worker
+
+def init_worker(width, height, cells):
+    global worker_graph
+    worker_graph = CorridorGraph(SimpleNamespace(width=width, height=height, cells=cells))
+
+def search_in_worker(start, goal):
+    return tuple(worker_graph.find_path(start, goal))
+
+
+class PathService:
+    """queue of path requests from enemies, searched a slice at a time so pathfinding never blows a tick's budget
+
+    With budget_us None every request is answered on the spot, which keeps headless runs and replays
+    deterministic. Otherwise request() answers from the maze's PathCache or queues the search and returns
+    None, and process() spends at most budget_us per tick on the queue, oldest request first, resuming an
+    unfinished search where it stopped. With workers > 0 the searches run in a process pool instead.
+    """
+    def __init__(self, maze, budget_us=None, workers=0):
+        self.maze = maze
+        self.budget_us = budget_us
+        self.workers = workers
+        self.pool = None
+        self.pending = OrderedDict()  # (start, goal) -> CorridorSearch (None until started), or a pool future
+        self.grid_version = maze.grid_version
+        self.completed = 0
+
+    def prepare(self):
+        """build the corridor graph now if the maze has not yet, so no tick ends up paying for it"""
+        return self.maze.corridor_graph
+
+    def request(self, start, goal):
+        """the path from start to goal, or None while it is still being searched for"""
+        maze = self.maze
+        if maze.grid_version != self.grid_version:
+            self.reset()
+        key = (start, goal)
+        if key in self.pending:  # enemies heading the same way share one search and one cache miss
+            return None
+        path = maze.path_cache.lookup(start, goal, maze)
+        if path is not None:
+            return path
+        if self.budget_us is None and not self.workers:
+            return maze.path_cache.store(start, goal, maze.corridor_graph.find_path(start, goal))
+        if self.workers:
+            self.pending[key] = self.worker_pool().submit(search_in_worker, start, goal)
+        else:
+            self.pending[key] = None  # the search itself is set up by process(), inside the budget
+        return None
+
+    def process(self):
+        """call once per tick to advance the queued searches"""
+        if not self.pending:
+            return
+        if self.maze.grid_version != self.grid_version:
+            self.reset()
+            return
+        cache = self.maze.path_cache
+        if self.workers:
+            for key, future in list(self.pending.items()):
+                if future.done():
+                    del self.pending[key]
+                    cache.store(*key, future.result())
+                    self.completed += 1
+            return
+        deadline = time.perf_counter_ns() + self.budget_us * 1000
+        graph = self.maze.corridor_graph
+        while self.pending and time.perf_counter_ns() < deadline:
+            key, search = next(iter(self.pending.items()))
+            if search is None:
+                search = self.pending[key] = graph.search(*key)
+            if not search.run(deadline):
+                break
+            del self.pending[key]
+            cache.store(*key, search.path)
+            self.completed += 1
+
+    def worker_pool(self):
+        if self.pool is None:
+            # imported here: the browser build has no multiprocessing and never asks for workers
+            from concurrent.futures import ProcessPoolExecutor
+            self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                            initargs=(self.maze.width, self.maze.height, bytes(self.maze.cells)))
+        return self.pool
+
+    def reset(self):
+        """drop every queued search, since they were started on a grid that has changed since"""
+        self.pending.clear()
+        self.grid_version = self.maze.grid_version
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
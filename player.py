@@ -1,11 +1,14 @@
 # player.py
 import pygame
 import math
-import random
+from occupancy import Occupancy
 from tower import Tower
 from utils import Colors, Constants
 
 class Player:
+    __slots__ = ('maze', 'w', 'h', 'pos', 'rect', 'speed', 'resources', 'direction', 'invincible', 'invincibility_timer',
+                 'speed_boost_timer', 'current_speed', 'moving', 'last_build_tick', 'slow_timer')
+
     def __init__(self, maze):
         self.maze = maze
         self.w = 24
@@ -20,10 +23,10 @@ class Player:
         self.speed_boost_timer = 0
         self.current_speed = self.speed
         self.moving = False
-        self.last_build_time = 0
+        self.last_build_tick = 0
         self.slow_timer = 0
 
-    def update(self, keys, game, time):
+    def update(self, keys, game):
         dx, dy = 0, 0
         if keys[pygame.K_LEFT]:
             dx, self.direction = -self.current_speed, 'left'
@@ -38,40 +41,38 @@ class Player:
 
         new_pos = [self.pos[0] + dx, self.pos[1] + dy]
         new_rect = pygame.Rect(new_pos[0], new_pos[1], self.w, self.h)
-        if not any(new_rect.colliderect(wall) for wall in self.maze.wall_rects):
+        if not self.maze.collides(new_rect):
             self.pos = new_pos
             self.rect = new_rect
 
-        if keys[pygame.K_SPACE] and time - self.last_build_time >= 500:
+        if keys[pygame.K_SPACE] and game.tick - self.last_build_tick >= Constants.FPS // 2:
             center = (int(self.pos[0]) + 12, int(self.pos[1]) + 12)
             face = ({'right': center[0] + 12, 'left': center[0] - 12, 'up': center[0], 'down': center[0]}[self.direction],
                     {'right': center[1], 'left': center[1], 'up': center[1] - 12, 'down': center[1] + 12}[self.direction])
-            x, y = face
-            tile_x, tile_y = x // Constants.TILE_SIZE, y // Constants.TILE_SIZE
-            tower = next((t for t in game.towers if
-                          ((t.x * Constants.TILE_SIZE) <= x < ((t.x + 1) * Constants.TILE_SIZE)) and
-                          ((t.y * Constants.TILE_SIZE) <= y < ((t.y + 1) * Constants.TILE_SIZE))), None)
-            if tower and tower.level < 10 and self.resources >= tower.level:
-                self.resources -= tower.level
-                tower.upgrade()
-            elif (tile_x, tile_y) not in self.maze.spawn_points and (tile_x, tile_y) != self.maze.base and \
-                    (tile_x, tile_y) not in self.maze.pellets and (tile_x, tile_y) not in self.maze.powerups and \
-                    not tower and self.resources >= 5:
-                game.towers.append(Tower(tile_x, tile_y))
-                self.resources -= 5
-            self.last_build_time = time
+            tile = (face[0] // Constants.TILE_SIZE, face[1] // Constants.TILE_SIZE)
+            occupancy = self.maze.occupancy
+            if occupancy.in_bounds(tile):
+                tower = occupancy.tower_at(tile)
+                if tower and tower.level < 10 and self.resources >= tower.level:
+                    self.resources -= tower.level
+                    game.upgrade_tower(tower)
+                elif occupancy.is_free(tile) and self.resources >= 5:
+                    game.add_tower(Tower(*tile))
+                    self.resources -= 5
+            self.last_build_tick = game.tick
 
+        # the 24px box can hold at most one tile centre: the one of the tile under its own centre
+        tile = (self.rect.centerx // Constants.TILE_SIZE, self.rect.centery // Constants.TILE_SIZE)
         half_tile_size = Constants.TILE_SIZE // 2
-        for i, pellet in enumerate(self.maze.pellets):
-            if self.rect.collidepoint(pellet[0] * Constants.TILE_SIZE + half_tile_size, pellet[1] * Constants.TILE_SIZE + half_tile_size):
+        flags = self.maze.occupancy.get(tile) if self.maze.occupancy.in_bounds(tile) else 0
+        if flags & (Occupancy.PELLET | Occupancy.POWERUP) and \
+                self.rect.collidepoint(tile[0] * Constants.TILE_SIZE + half_tile_size, tile[1] * Constants.TILE_SIZE + half_tile_size):
+            if flags & Occupancy.PELLET:
                 self.resources += 1
                 game.score += 1
-                del self.maze.pellets[i]
-                break
-
-        for i, powerup in enumerate(self.maze.powerups):
-            if self.rect.collidepoint(powerup[0] * Constants.TILE_SIZE + half_tile_size, powerup[1] * Constants.TILE_SIZE + half_tile_size):
-                effect = random.choice(['speed', 'invincibility', 'tower_boost', 'freeze'])
+                self.maze.remove_pellet(tile)
+            if flags & Occupancy.POWERUP:
+                effect = game.rng.powerups.choice(['speed', 'invincibility', 'tower_boost', 'freeze'])
                 if effect == 'speed':
                     self.speed_boost_timer = 10 * Constants.FPS
                     self.current_speed = self.speed * 1.5
@@ -82,8 +83,7 @@ class Player:
                     game.tower_boost_timer = 20 * Constants.FPS
                 elif effect == 'freeze':
                     game.freeze_timer = 5 * Constants.FPS
-                del self.maze.powerups[i]
-                break
+                self.maze.remove_powerup(tile)
 
         if self.invincibility_timer > 0:
             self.invincibility_timer -= 1
@@ -98,32 +98,7 @@ class Player:
             if self.slow_timer <= 0:
                 self.current_speed = self.speed
 
-    def draw(self, screen, time):
+    def sprites(self, atlas, time):
         color = Colors.LIGHT_YELLOW if self.invincible and (time // 10) % 2 else Colors.YELLOW
-        center = (int(self.pos[0]) + 12, int(self.pos[1]) + 12)
-        radius = 12
         mouth_angle = 40 * abs(math.sin(time / 100)) if self.moving else 0
-        start_angle = {'right': 0, 'left': 180, 'up': 90, 'down': 270}[self.direction]
-        if mouth_angle == 0:
-            pygame.draw.circle(screen, color, center, radius)
-            face = ({'right': center[0]+12, 'left': center[0]-12, 'up': center[0], 'down': center[0]}[self.direction],
-                    {'right': center[1], 'left': center[1], 'up': center[1]-12, 'down': center[1]+12}[self.direction])
-            pygame.draw.line(screen, Colors.BLACK, center, face, 1)
-        else:
-            arc_points = []
-            step = 5
-            start_arc = (start_angle + mouth_angle) % 360
-            end_arc = (start_angle - mouth_angle + 360) % 360
-            num_points = int((360 - 2*mouth_angle) // step)
-            for i in range(num_points):
-                current_angle = i * step + start_arc
-                rad = math.radians(current_angle)
-                px = center[0] + radius * math.cos(rad)
-                py = center[1] - radius * math.sin(rad)
-                arc_points.append((px, py))
-            rad = math.radians(end_arc)
-            px = center[0] + radius * math.cos(rad)
-            py = center[1] - radius * math.sin(rad)
-            arc_points.append((px, py))
-            points = [center] + arc_points
-            pygame.draw.polygon(screen, color, points)
+        return ((atlas.player(self.direction, color, mouth_angle), (int(self.pos[0]), int(self.pos[1]))),)
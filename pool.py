@@ -0,0 +1,34 @@
+# pool.py
+
+class Pool:
+    """free list of one entity class; acquire() re-runs reset() on a released instance before allocating a new one
+
+    Pooled classes keep a generation counter that release() bumps, so anything holding on to an entity
+    (a projectile and its target) can tell when it has died or been handed out again.
+    """
+    def __init__(self, cls):
+        self.cls = cls
+        self.free = []
+        self.allocated = 0
+
+    def acquire(self, *args):
+        if self.free:
+            entity = self.free.pop()
+            entity.reset(*args)
+            return entity
+        self.allocated += 1
+        return self.cls(*args)
+
+    def release(self, entity):
+        entity.generation += 1
+        self.free.append(entity)
+
+
+def swap_remove(entities, index):
+    """remove entities[index] in O(1) by moving the last entity into its place and updating that entity's slot"""
+    entity = entities[index]
+    last = entities.pop()
+    if last is not entity:
+        entities[index] = last
+        last.slot = index
+    return entity
@@ -0,0 +1,66 @@
+# profiler.py
+import json
+import time
+from array import array
+
+class FrameProfiler:
+    """nanosecond timings of each phase of recent frames, kept in fixed-size ring buffers
+
+    Callers bracket a frame with start_frame() and end_frame() and call lap(phase) after each phase;
+    a phase's time is the time since the previous lap. Game skips every call when it has no profiler.
+    """
+    PHASES = ('events', 'player', 'spawning', 'paths', 'enemies', 'towers', 'projectiles', 'waves', 'regen', 'draw', 'flip')
+
+    def __init__(self, frames=300):
+        self.frames = frames
+        self.buffers = {phase: array('q', [0]) * frames for phase in self.PHASES + ('total',)}
+        self.index = 0  # slot the next frame is written to
+        self.filled = 0
+        self.current = dict.fromkeys(self.PHASES, 0)
+        self.frame_start = self.last = 0
+        self.counts = {}  # entity counts at the end of the latest frame
+
+    def start_frame(self):
+        self.frame_start = self.last = time.perf_counter_ns()
+
+    def lap(self, phase):
+        now = time.perf_counter_ns()
+        self.current[phase] += now - self.last
+        self.last = now
+
+    def discard_frame(self):
+        """forget the laps since start_frame(), for a pass of the loop that turned out not to be a frame"""
+        for phase in self.current:
+            self.current[phase] = 0
+
+    def end_frame(self, counts=None):
+        index = self.index
+        for phase, elapsed in self.current.items():
+            self.buffers[phase][index] = elapsed
+            self.current[phase] = 0
+        self.buffers['total'][index] = time.perf_counter_ns() - self.frame_start
+        self.index = (index + 1) % self.frames
+        self.filled = min(self.filled + 1, self.frames)
+        if counts:
+            self.counts = counts
+
+    def percentiles(self, phase, points=(50, 95, 99)):
+        """milliseconds at each percentile of the buffered frames, nearest-rank"""
+        samples = sorted(self.buffers[phase][:self.filled])
+        if not samples:
+            return [0.0] * len(points)
+        return [samples[min(len(samples) - 1, len(samples) * point // 100)] / 1e6 for point in points]
+
+    def stats(self):
+        phases = {}
+        for phase in self.buffers:
+            p50, p95, p99 = self.percentiles(phase)
+            samples = self.buffers[phase][:self.filled]
+            phases[phase] = {'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+                             'mean_ms': sum(samples) / len(samples) / 1e6 if samples else 0.0,
+                             'max_ms': max(samples) / 1e6 if samples else 0.0}
+        return {'frames': self.filled, 'phases': phases, 'counts': self.counts}
+
+    def export(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.stats(), file, indent=2)
@@ -0,0 +1,151 @@
+# replay.py
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import struct
+import sys
+import time
+import zlib
+import pygame
+from main import Game
+from utils import Constants
+
+RECORDED_KEYS = (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT, pygame.K_SPACE,
+                 pygame.K_RETURN, pygame.K_ESCAPE, pygame.K_q, pygame.K_m)
+CHECKPOINT_TICKS = Constants.FPS  # one state checksum per simulated second
+RECORDING_MAGIC = b'MDR2'
+RUN = struct.Struct('<HI')  # key mask, ticks it was held
+CHECKSUM = struct.Struct('<II')  # tick, crc32 of the game state after that tick
+
+def key_mask(keys):
+    mask = 0
+    for bit, key in enumerate(RECORDED_KEYS):
+        if keys[key]:
+            mask |= 1 << bit
+    return mask
+
+class MaskKeys:
+    """pressed-key lookup rebuilt from a recorded key mask"""
+    def __init__(self, mask):
+        self.mask = mask
+
+    def __getitem__(self, key):
+        return key in RECORDED_KEYS and bool(self.mask >> RECORDED_KEYS.index(key) & 1)
+
+def state_checksum(game):
+    """crc32 over everything the simulation decides, compared between a recording and its replay"""
+    state = [game.state, game.score, game.base_health, game.wave_number, game.spawned_enemies,
+             game.destroyed_enemies, game.total_enemies, game.wave_timer, game.spawn_timer,
+             game.tower_boost_timer, game.freeze_timer]
+    if game.player:
+        player = game.player
+        state += [float(player.pos[0]), float(player.pos[1]), player.resources, player.current_speed]
+        state += [(float(e.pos[0]), float(e.pos[1]), e.hit_points, e.behavior) for e in game.enemies]
+        state += [(t.x, t.y, t.level, t.last_shot) for t in game.towers]
+        state += [(float(p.pos[0]), float(p.pos[1])) for p in game.projectiles]
+        state += [len(game.maze.pellets), len(game.maze.powerups)]
+    return zlib.crc32(repr(state).encode())
+
+
+class Recording:
+    """one session's seed, settings and run-length encoded per-tick key states, with state checksums
+    to verify a replay against"""
+    def __init__(self, seed, vectorized=False, menu_params=None):
+        self.seed = seed
+        self.vectorized = vectorized
+        self.menu_params = menu_params  # None when the session began in the menu rather than in a started game
+        self.runs = []  # [key mask, tick count]
+        self.checksums = {}  # tick -> state checksum
+        self.ticks = 0
+
+    def append(self, mask):
+        if self.runs and self.runs[-1][0] == mask:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([mask, 1])
+        self.ticks += 1
+
+    def inputs(self):
+        """keys for every recorded tick"""
+        for mask, count in self.runs:
+            keys = MaskKeys(mask)
+            for _ in range(count):
+                yield keys
+
+    def save(self, path):
+        header = json.dumps({'seed': self.seed, 'vectorized': self.vectorized, 'menu_params': self.menu_params}).encode()
+        with open(path, 'wb') as file:
+            file.write(RECORDING_MAGIC + struct.pack('<I', len(header)) + header)
+            file.write(struct.pack('<I', len(self.runs)))
+            file.write(b''.join(RUN.pack(mask, count) for mask, count in self.runs))
+            file.write(struct.pack('<I', len(self.checksums)))
+            file.write(b''.join(CHECKSUM.pack(tick, crc) for tick, crc in sorted(self.checksums.items())))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            data = file.read()
+        if data[:4] != RECORDING_MAGIC:
+            raise ValueError(f"{path} is not a Maze Defender recording")
+        offset = 4
+        (length,) = struct.unpack_from('<I', data, offset)
+        header = json.loads(data[offset + 4:offset + 4 + length])
+        offset += 4 + length
+        recording = cls(header['seed'], header['vectorized'], header['menu_params'])
+        (count,) = struct.unpack_from('<I', data, offset)
+        offset += 4
+        recording.runs = [list(RUN.unpack_from(data, offset + i * RUN.size)) for i in range(count)]
+        recording.ticks = sum(run[1] for run in recording.runs)
+        offset += count * RUN.size
+        (count,) = struct.unpack_from('<I', data, offset)
+        offset += 4
+        recording.checksums = dict(CHECKSUM.unpack_from(data, offset + i * CHECKSUM.size) for i in range(count))
+        return recording
+
+
+class Recorder:
+    """appends each step's input to a Recording, plus a state checksum every CHECKPOINT_TICKS ticks"""
+    def __init__(self, game, menu_params=None):
+        self.game = game
+        self.recording = Recording(game.seed, game.vectorized, menu_params)
+
+    def record(self, keys):
+        """call after game.step(keys)"""
+        self.recording.append(key_mask(keys))
+        if self.recording.ticks % CHECKPOINT_TICKS == 0:
+            self.recording.checksums[self.recording.ticks - 1] = state_checksum(self.game)
+
+
+def replay(recording, check=True):
+    """re-run a recording headless with no frame pacing; returns (ticks, seconds, first diverging tick or None)"""
+    game = Game(vectorized=recording.vectorized, seed=recording.seed)
+    if recording.menu_params is not None:
+        game.set_menu_params(recording.menu_params)
+        game.start_game()
+    checksums = recording.checksums if check else {}
+    diverged = None
+    started = time.perf_counter()
+    for tick, keys in enumerate(recording.inputs()):
+        game.step(keys)
+        if tick in checksums and state_checksum(game) != checksums[tick]:
+            diverged = tick
+            break
+    return tick + 1 if recording.ticks else 0, time.perf_counter() - started, diverged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded Maze Defender session as fast as possible")
+    parser.add_argument('path')
+    parser.add_argument('--no-check', action='store_true', help="skip the state checksum comparison")
+    args = parser.parse_args()
+
+    recording = Recording.load(args.path)
+    ticks, elapsed, diverged = replay(recording, not args.no_check)
+    print(f"ticks: {ticks} ({ticks / elapsed if elapsed > 0 else 0:.0f}/s), seed: {recording.seed}, "
+          f"checksums: {'skipped' if args.no_check else 'ok' if diverged is None else f'diverged at tick {diverged}'}")
+    return 1 if diverged is not None else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
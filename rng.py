@@ -0,0 +1,11 @@
+# rng.py
+import random
+
+class RandomStreams:
+    """independent seeded generators per subsystem, so extra draws in one never shift another's sequence"""
+    SUBSYSTEMS = ('maze', 'spawns', 'enemies', 'items', 'powerups')
+
+    def __init__(self, seed):
+        self.seed = seed
+        for name in self.SUBSYSTEMS:
+            setattr(self, name, random.Random(f"{seed}:{name}"))
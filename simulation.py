@@ -0,0 +1,158 @@
+# simulation.py
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import pygame
+import time as time_module
+from collections import deque
+from main import Game
+from maze_library import MazeLibrary
+from profiler import FrameProfiler
+from replay import Recorder
+from utils import Constants, Directions
+
+class KeyState:
+    """pressed-key lookup that stands in for pygame.key.get_pressed()"""
+    def __init__(self, pressed=()):
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+NO_KEYS = KeyState()
+
+class Simulation:
+    """display-free game stepped one fixed tick at a time with injected input, as fast as the CPU allows"""
+    def __init__(self, menu_params=None, vectorized=False, maze_library=None, seed=None, record=False, profile=False):
+        self.game = Game(vectorized=vectorized, maze_library=maze_library, seed=seed)
+        self.game.set_menu_params(menu_params or {})
+        if record:
+            self.game.recorder = Recorder(self.game, menu_params or {})
+        if profile:
+            self.game.profiler = FrameProfiler()
+        self.ticks = 0
+        self.game.start_game()
+
+    @property
+    def finished(self):
+        return self.game.state != 'playing'
+
+    def step(self, keys=NO_KEYS):
+        prof = self.game.profiler
+        if prof:
+            prof.start_frame()
+        running = self.game.step(keys)
+        if prof:
+            prof.end_frame(self.game.entity_counts())
+        if self.game.recorder:
+            self.game.recorder.record(keys)
+        self.ticks += 1
+        return running and not self.finished
+
+    def run(self, max_ticks, policy=None):
+        """step until the game ends or max_ticks pass; policy(game) returns the keys for each tick"""
+        while self.ticks < max_ticks:
+            keys = policy(self.game) if policy else NO_KEYS
+            if not self.step(keys):
+                break
+        return self.ticks
+
+
+class PelletCollectorPolicy:
+    """scripted player: walks to the nearest pellet and presses space whenever a tower is affordable"""
+    MOVE_KEYS = {(1, 0): pygame.K_RIGHT, (-1, 0): pygame.K_LEFT, (0, 1): pygame.K_DOWN, (0, -1): pygame.K_UP}
+
+    def __init__(self):
+        self.maze = None
+        self.route = []
+
+    def __call__(self, game):
+        if game.maze is not self.maze:
+            self.maze = game.maze
+            self.route = []
+        player = game.player
+        tile = (int(player.pos[0] + 12) // Constants.TILE_SIZE, int(player.pos[1] + 12) // Constants.TILE_SIZE)
+        if self.route and self.route[0] == tile:
+            x, y = tile
+            if abs(player.pos[0] - (x * Constants.TILE_SIZE + 4)) <= player.current_speed / 2 and \
+                    abs(player.pos[1] - (y * Constants.TILE_SIZE + 4)) <= player.current_speed / 2:
+                self.route.pop(0)
+        if not self.route or self.route[-1] not in self.maze.pellets:
+            self.route = self.find_route(tile)
+
+        pressed = []
+        if self.route:
+            x, y = self.route[0]
+            dx = x * Constants.TILE_SIZE + 4 - player.pos[0]
+            dy = y * Constants.TILE_SIZE + 4 - player.pos[1]
+            # line up across the corridor before moving along it, or the box snags on the wall ends
+            horizontal = (self.MOVE_KEYS[(1 if dx > 0 else -1, 0)], abs(dx))
+            vertical = (self.MOVE_KEYS[(0, 1 if dy > 0 else -1)], abs(dy))
+            major, minor = (horizontal, vertical) if abs(dx) >= abs(dy) else (vertical, horizontal)
+            tolerance = player.current_speed / 2
+            if minor[1] > tolerance:
+                pressed.append(minor[0])
+            elif major[1] > tolerance:
+                pressed.append(major[0])
+        if player.resources >= 5:
+            pressed.append(pygame.K_SPACE)
+        return KeyState(pressed)
+
+    def find_route(self, start):
+        # the player is only stopped by solid walls, so one-way passages are walkable both ways
+        maze = self.maze
+        came_from = {start: None}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            if current in maze.pellets:
+                route = []
+                while current != start:
+                    route.append(current)
+                    current = came_from[current]
+                return [start] + route[::-1]
+            x, y = current
+            mask = maze.cells[y * maze.width + x]
+            for bit, dx, dy, opp in Directions.STEPS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < maze.width and 0 <= ny < maze.height and (nx, ny) not in came_from and \
+                        (mask & bit or maze.cells[ny * maze.width + nx] & opp):
+                    came_from[(nx, ny)] = current
+                    queue.append((nx, ny))
+        return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a headless Maze Defender game")
+    parser.add_argument('--ticks', type=int, default=20 * 60 * Constants.FPS)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--width', type=int, default=20)
+    parser.add_argument('--height', type=int, default=15)
+    parser.add_argument('--spawns', type=int, default=2)
+    parser.add_argument('--waves', type=int, default=5)
+    parser.add_argument('--enemies', type=int, default=10)
+    parser.add_argument('--idle', action='store_true', help="leave the player idle instead of collecting pellets")
+    parser.add_argument('--vectorized', action='store_true', help="move enemies and projectiles with numpy")
+    parser.add_argument('--library', help="maze library file (see maze_library.py) to draw the maze from")
+    parser.add_argument('--record', help="save the run's input and state checksums to this file for replay.py")
+    parser.add_argument('--profile', help="write per-phase tick timings of the last 300 ticks to this JSON file")
+    args = parser.parse_args()
+
+    sim = Simulation({'width': args.width, 'height': args.height, 'spawns': args.spawns,
+                      'waves': args.waves, 'enemies': args.enemies}, vectorized=args.vectorized,
+                     maze_library=MazeLibrary(args.library) if args.library else None,
+                     seed=args.seed, record=bool(args.record), profile=bool(args.profile))
+    started = time_module.perf_counter()
+    ticks = sim.run(args.ticks, None if args.idle else PelletCollectorPolicy())
+    elapsed = time_module.perf_counter() - started
+    game = sim.game
+    print(f"ticks: {ticks} ({ticks / elapsed:.0f}/s), wave: {game.wave_number}, "
+          f"base health: {game.base_health}, score: {game.score}, towers: {len(game.towers)}")
+    if args.record:
+        game.recorder.recording.save(args.record)
+    if args.profile:
+        game.profiler.export(args.profile)
+
+if __name__ == "__main__":
+    main()
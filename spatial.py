@@ -0,0 +1,69 @@
+# spatial.py
+from utils import Constants
+
+class TileIndex:
+    """entities bucketed by the maze tile under their position, rebuilt once per tick"""
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.buckets = {}  # y * width + x -> entities on that tile
+
+    def tile_key(self, pos):
+        x = min(max(int(pos[0]) // Constants.TILE_SIZE, 0), self.width - 1)
+        y = min(max(int(pos[1]) // Constants.TILE_SIZE, 0), self.height - 1)
+        return y * self.width + x
+
+    def rebuild(self, entities):
+        buckets = {}
+        for entity in entities:
+            key = self.tile_key(entity.pos)
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [entity]
+            else:
+                bucket.append(entity)
+        self.buckets = buckets
+
+    def remove(self, entity):
+        bucket = self.buckets.get(self.tile_key(entity.pos))
+        if bucket and entity in bucket:
+            bucket.remove(entity)
+
+    def query_radius(self, x, y, radius):
+        """entities on tiles that overlap the circle; callers still check the exact distance"""
+        tile = Constants.TILE_SIZE
+        min_x, max_x = max(int(x - radius) // tile, 0), min(int(x + radius) // tile, self.width - 1)
+        min_y, max_y = max(int(y - radius) // tile, 0), min(int(y + radius) // tile, self.height - 1)
+        if len(self.buckets) < (max_x - min_x + 1) * (max_y - min_y + 1):
+            # sparser than the query box: walk the occupied tiles instead of the box
+            for key, bucket in self.buckets.items():
+                if min_y <= key // self.width <= max_y and min_x <= key % self.width <= max_x:
+                    yield from bucket
+            return
+        radius_sq = radius * radius
+        for ty in range(min_y, max_y + 1):
+            # distance from the centre to the nearest point of the tile row and column
+            dy = max(ty * tile - y, 0, y - (ty + 1) * tile)
+            row = ty * self.width
+            for tx in range(min_x, max_x + 1):
+                bucket = self.buckets.get(row + tx)
+                if bucket:
+                    dx = max(tx * tile - x, 0, x - (tx + 1) * tile)
+                    if dx * dx + dy * dy <= radius_sq:
+                        yield from bucket
+
+    def query_tiles(self, min_x, min_y, max_x, max_y):
+        """entities on the tiles in the inclusive range"""
+        found = []
+        if len(self.buckets) < (max_x - min_x + 1) * (max_y - min_y + 1):
+            for key, bucket in self.buckets.items():
+                if min_y <= key // self.width <= max_y and min_x <= key % self.width <= max_x:
+                    found.extend(bucket)
+            return found
+        for ty in range(min_y, max_y + 1):
+            row = ty * self.width
+            for tx in range(min_x, max_x + 1):
+                bucket = self.buckets.get(row + tx)
+                if bucket:
+                    found.extend(bucket)
+        return found
@@ -0,0 +1,122 @@
+# sprites.py
+import math
+import pygame
+from utils import Colors, Constants
+
+class SpriteAtlas:
+    """animation frames rasterized once at startup so entity draws become blits"""
+    GHOST_PHASES = 16
+    MOUTH_STEP = 5  # degrees between pre-rendered mouth angles
+    MAX_MOUTH_ANGLE = 40
+    GEM_STEPS = 16  # pre-rendered hover offsets across the gem's -4..4 pixel travel
+    BAR_WIDTH = 24
+
+    def __init__(self):
+        self.ghost_frames = [self.render_ghost(2 * math.pi * i / self.GHOST_PHASES) for i in range(self.GHOST_PHASES)]
+        self.player_frames = {(direction, color, step): self.render_player(direction, color, step * self.MOUTH_STEP)
+                              for direction in ('right', 'left', 'up', 'down')
+                              for color in (Colors.YELLOW, Colors.LIGHT_YELLOW)
+                              for step in range(self.MAX_MOUTH_ANGLE // self.MOUTH_STEP + 1)}
+        self.tower_body = self.render_tower_body()
+        self.gem_frames = [self.render_gem(8 * i / self.GEM_STEPS - 4) for i in range(self.GEM_STEPS + 1)]
+        self.health_bars = {(width, color): self.render_bar(width, color, Colors.BLACK)
+                            for width in range(self.BAR_WIDTH + 1)
+                            for color in (Colors.GREEN, Colors.YELLOW, Colors.RED)}
+        self.cooldown_bars = [self.render_bar(width, Colors.BLUE) for width in range(self.BAR_WIDTH + 1)]
+        self.range_rings = {}
+
+    @staticmethod
+    def new_surface(width, height):
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        return surface.convert_alpha() if pygame.display.get_surface() else surface
+
+    def render_ghost(self, phase):
+        # same outline Enemy used to build every frame, drawn around a local centre of (12, 12)
+        surface = self.new_surface(25, 28)
+        cx, cy = 12, 12
+        arc_points = []
+        for angle in range(180, 0, -18):
+            rad = math.radians(angle)
+            arc_points.append((cx + 12 * math.cos(rad), cy + 12 * -math.sin(rad)))
+        wavy_points = []
+        num_wavy = 10
+        for i in range(num_wavy + 1):
+            t = i / num_wavy
+            wavy_points.append((cx + 12 - t * 24, cy + 12 + 2 * math.sin(4 * math.pi * t + phase)))
+        points = [(cx - 12, cy)] + arc_points + [(cx + 12, cy + 12)] + wavy_points + [(cx - 12, cy + 12), (cx - 12, cy)]
+        pygame.draw.polygon(surface, Colors.RED, points)
+        return surface
+
+    def render_player(self, direction, color, mouth_angle):
+        surface = self.new_surface(25, 25)
+        center = (12, 12)
+        radius = 12
+        if mouth_angle == 0:
+            pygame.draw.circle(surface, color, center, radius)
+            face = ({'right': center[0] + 12, 'left': center[0] - 12, 'up': center[0], 'down': center[0]}[direction],
+                    {'right': center[1], 'left': center[1], 'up': center[1] - 12, 'down': center[1] + 12}[direction])
+            pygame.draw.line(surface, Colors.BLACK, center, face, 1)
+            return surface
+        start_angle = {'right': 0, 'left': 180, 'up': 90, 'down': 270}[direction]
+        step = 5
+        start_arc = (start_angle + mouth_angle) % 360
+        end_arc = (start_angle - mouth_angle + 360) % 360
+        arc_points = []
+        for i in range(int((360 - 2 * mouth_angle) // step)):
+            rad = math.radians(i * step + start_arc)
+            arc_points.append((center[0] + radius * math.cos(rad), center[1] - radius * math.sin(rad)))
+        rad = math.radians(end_arc)
+        arc_points.append((center[0] + radius * math.cos(rad), center[1] - radius * math.sin(rad)))
+        pygame.draw.polygon(surface, color, [center] + arc_points)
+        return surface
+
+    def render_tower_body(self):
+        surface = self.new_surface(Constants.TILE_SIZE, Constants.TILE_SIZE)
+        size = 28
+        offset = (Constants.TILE_SIZE - size) // 2
+        pygame.draw.rect(surface, Colors.PURPLE, (offset, offset, size, size))
+        pygame.draw.polygon(surface, Colors.GRAY, [(offset + size / 2, offset + size * 4 / 5),
+                                                   (offset + size / 5, size),
+                                                   (offset + size * 4 / 5, size)])
+        return surface
+
+    def render_gem(self, hover_offset):
+        # drawn at its place on a tile, then cropped so the per-frame blit only covers the gem itself
+        surface = self.new_surface(Constants.TILE_SIZE, Constants.TILE_SIZE)
+        gem_y = Constants.TILE_SIZE // 2 + hover_offset
+        pygame.draw.polygon(surface, Colors.LIGHT_GRAY, [(16, gem_y - 5), (21, gem_y), (16, gem_y + 5), (11, gem_y)])
+        bounds = surface.get_bounding_rect()
+        return surface.subsurface(bounds).copy(), bounds.topleft
+
+    def render_bar(self, width, color, outline=None):
+        surface = self.new_surface(self.BAR_WIDTH, 4)
+        pygame.draw.rect(surface, color, (0, 0, width, 4))
+        if outline:
+            pygame.draw.rect(surface, outline, (0, 0, self.BAR_WIDTH, 4), 1)
+        return surface
+
+    def ghost(self, time):
+        return self.ghost_frames[int(time / 100.0 / (2 * math.pi) * self.GHOST_PHASES) % self.GHOST_PHASES]
+
+    def player(self, direction, color, mouth_angle):
+        return self.player_frames[(direction, color, round(mouth_angle / self.MOUTH_STEP))]
+
+    def gem(self, hover_offset):
+        """(surface, offset from the tile corner) of the tower's gem"""
+        return self.gem_frames[round((hover_offset + 4) * self.GEM_STEPS / 8)]
+
+    def health_bar(self, ratio):
+        color = Colors.GREEN if ratio > 0.5 else Colors.YELLOW if ratio > 0.25 else Colors.RED
+        return self.health_bars[(max(0, min(self.BAR_WIDTH, int(self.BAR_WIDTH * ratio))), color)]
+
+    def cooldown_bar(self, ratio):
+        return self.cooldown_bars[max(0, min(self.BAR_WIDTH, int(self.BAR_WIDTH * ratio)))]
+
+    def range_ring(self, radius):
+        ring = self.range_rings.get(radius)
+        if ring is None:
+            size = int(radius) * 2 + 1
+            ring = self.new_surface(size, size)
+            pygame.draw.circle(ring, Colors.LIGHT_GRAY, (int(radius), int(radius)), radius, 1)
+            self.range_rings[radius] = ring
+        return ring
@@ -0,0 +1,17 @@
+# test_collision.py
+import random
+import pygame
+import pytest
+from maze import Maze
+from utils import Constants
+
+@pytest.mark.parametrize('width, height, seed', [(20, 15, 1), (37, 23, 2)])
+def test_collides_matches_every_wall_rect(width, height, seed):
+    maze = Maze(width, height, 2, seed=seed)
+    walls = maze.generate_wall_rects()
+    rng = random.Random(seed)
+    for _ in range(3000):
+        size = rng.choice((1, 8, 24, 32, 40))
+        rect = pygame.Rect(rng.randrange(width * Constants.TILE_SIZE - size),
+                           rng.randrange(height * Constants.TILE_SIZE - size), size, size)
+        assert maze.collides(rect) == (rect.collidelist(walls) != -1), rect
@@ -0,0 +1,35 @@
+# test_corridors.py
+import random
+import pytest
+from corridors import CorridorGraph
+from maze import Maze
+from utils import Directions, a_star
+
+def assert_walkable(maze, path, start, goal):
+    assert path[0] == start and path[-1] == goal
+    for (x, y), (next_x, next_y) in zip(path, path[1:]):
+        bit = next(bit for bit, dx, dy, _ in Directions.STEPS if (x + dx, y + dy) == (next_x, next_y))
+        assert maze.cells[y * maze.width + x] & bit, ((x, y), (next_x, next_y))
+
+@pytest.mark.parametrize('width, height, seed', [(20, 15, 1), (41, 29, 2), (80, 60, 3)])
+def test_paths_as_short_as_a_star(width, height, seed):
+    maze = Maze(width, height, 2, seed=seed)
+    graph = CorridorGraph(maze)
+    rng = random.Random(seed)
+    tiles = [(x, y) for y in range(height) for x in range(width)]
+    pairs = [(rng.choice(tiles), rng.choice(tiles)) for _ in range(300)] + [(maze.base, maze.base)]
+    pairs += [(spawn, maze.base) for spawn in maze.spawn_points]
+    for start, goal in pairs:
+        expected = a_star(start, goal, maze)
+        path = list(graph.find_path(start, goal))
+        assert len(path) == len(expected), (start, goal)
+        if path:
+            assert_walkable(maze, path, start, goal)
+
+def test_search_resumes_to_the_same_path():
+    maze = Maze(60, 40, 2, seed=6)
+    start, goal = (0, 0), (59, 39)
+    search = maze.corridor_graph.search(start, goal)
+    while not search.run(0):  # a deadline that has always passed: one slice per call
+        pass
+    assert list(search.path) == list(maze.corridor_graph.find_path(start, goal))
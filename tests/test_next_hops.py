@@ -0,0 +1,44 @@
+# test_next_hops.py
+import random
+from maze import Maze
+from next_hops import NextHopTable
+from utils import a_star
+
+def built_table(maze):
+    table = NextHopTable(maze)
+    table.start()
+    assert table.ready
+    return table
+
+def test_distances_match_a_star_and_steps_reach_the_goal():
+    maze = Maze(20, 15, 2, seed=8)
+    table = built_table(maze)
+    rng = random.Random(8)
+    tiles = [(x, y) for y in range(maze.height) for x in range(maze.width)]
+    for _ in range(300):
+        start, goal = rng.choice(tiles), rng.choice(tiles)
+        distance = table.get_distance(start, goal)
+        assert distance == len(a_star(start, goal, maze)) - 1, (start, goal)
+        tile = start
+        for _ in range(max(distance, 0)):
+            tile = table.next_tile(tile, goal)
+        assert tile == (goal if distance >= 0 else start)
+        assert table.next_tile(tile, goal) is None
+
+def test_distances_to_the_base_match_the_flow_field():
+    maze = Maze(32, 32, 3, seed=9)
+    table = built_table(maze)
+    flow_field = maze.flow_field
+    for y in range(maze.height):
+        for x in range(maze.width):
+            assert table.get_distance((x, y), maze.base) == flow_field.get_distance((x, y)), (x, y)
+
+def test_background_build_matches():
+    maze = Maze(20, 15, 2, seed=10)
+    table = NextHopTable(maze)
+    table.start(background=True)
+    table.thread.join()
+    assert table.ready
+    expected = built_table(maze)
+    assert table.distance == expected.distance
+    assert table.next_step == expected.next_step
@@ -0,0 +1,34 @@
+# test_replay.py
+import pytest
+from entity_store import HAS_NUMPY
+from replay import Recording, replay
+from simulation import PelletCollectorPolicy, Simulation
+
+MENU = {'width': 20, 'height': 15, 'waves': 3, 'enemies': 8}
+
+def record(seed, vectorized=False, ticks=1500):
+    sim = Simulation(MENU, vectorized=vectorized, seed=seed, record=True)
+    sim.run(ticks, PelletCollectorPolicy())
+    return sim.game.recorder.recording
+
+@pytest.mark.parametrize('vectorized', [False, pytest.param(True, marks=pytest.mark.skipif(
+    not HAS_NUMPY, reason="the vectorized engine needs numpy"))])
+def test_replay_matches_checksums(tmp_path, vectorized):
+    recording = record(3, vectorized)
+    assert recording.checksums
+    path = tmp_path / 'run.rec'
+    recording.save(path)
+    loaded = Recording.load(path)
+    assert loaded.checksums == recording.checksums
+    ticks, _, diverged = replay(loaded)
+    assert diverged is None
+    assert ticks == recording.ticks
+
+def test_replay_reports_divergence():
+    recording = record(5)
+    tick = sorted(recording.checksums)[1]
+    recording.checksums[tick] ^= 1
+    assert replay(recording)[2] == tick
+
+def test_same_seed_same_game():
+    assert record(7).checksums == record(7).checksums
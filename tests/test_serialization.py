@@ -0,0 +1,42 @@
+# test_serialization.py
+import pytest
+from maze import Maze
+from maze_library import MazeLibrary, write_library
+
+def assert_same_maze(loaded, maze):
+    assert (loaded.width, loaded.height, loaded.seed) == (maze.width, maze.height, maze.seed)
+    assert loaded.cells == maze.cells
+    assert loaded.spawn_points == maze.spawn_points
+    assert loaded.base == maze.base
+    assert loaded.pellets == maze.pellets
+    assert loaded.powerups == maze.powerups
+    assert loaded.occupancy.flags == maze.occupancy.flags
+
+@pytest.mark.parametrize('width, height, spawns', [(20, 15, 2), (15, 13, 3), (64, 48, 1)])
+def test_round_trip(width, height, spawns):
+    maze = Maze(width, height, spawns, seed=width * height)
+    assert_same_maze(Maze.from_bytes(maze.to_bytes()), maze)
+
+def test_round_trip_after_pickups():
+    maze = Maze(20, 15, 2, seed=4)
+    for tile in sorted(maze.pellets)[::3]:
+        maze.remove_pellet(tile)
+    for tile in sorted(maze.powerups)[:1]:
+        maze.remove_powerup(tile)
+    assert_same_maze(Maze.from_bytes(maze.to_bytes()), maze)
+
+def test_from_bytes_rejects_other_data():
+    with pytest.raises(ValueError):
+        Maze.from_bytes(b'\0' * 64)
+
+def test_library_returns_stored_mazes(tmp_path):
+    mazes = [Maze(20, 15, 2, seed=seed) for seed in range(3)] + [Maze(25, 15, 2, seed=9)]
+    path = tmp_path / 'mazes.mzl'
+    write_library(path, mazes)
+    library = MazeLibrary(path)
+    try:
+        assert len(library) == len(mazes)
+        for index, maze in enumerate(mazes):
+            assert_same_maze(library[index], maze)
+    finally:
+        library.close()
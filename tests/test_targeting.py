@@ -0,0 +1,41 @@
+# test_targeting.py
+import random
+import pytest
+from entity_store import HAS_NUMPY, EntityStore
+from enemy import Enemy
+from maze import Maze
+from utils import Constants
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def full_scan(store, center, radius, base_center):
+    """the target as a scan over every enemy picks it: closest to the base in range, lowest slot on ties"""
+    pos = store.enemy_pos[:len(store.enemies)]
+    in_range = np.flatnonzero(np.hypot(pos[:, 0] - center[0], pos[:, 1] - center[1]) <= radius)
+    if not len(in_range):
+        return None
+    base_dist = np.hypot(pos[in_range, 0] - base_center[0], pos[in_range, 1] - base_center[1])
+    return store.enemies[in_range[np.argmin(base_dist)]]
+
+@pytest.mark.skipif(not HAS_NUMPY, reason="the vectorized engine needs numpy")
+@pytest.mark.parametrize('enemies, seed', [(1, 1), (40, 2), (400, 3)])
+def test_find_targets_matches_a_full_scan(enemies, seed):
+    maze = Maze(30, 20, 2, seed=seed)
+    rng = random.Random(seed)
+    store = EntityStore()
+    tile = Constants.TILE_SIZE
+    for _ in range(enemies):
+        enemy = Enemy((rng.randrange(maze.width), rng.randrange(maze.height)), 'shortest', maze, 1, rng)
+        enemy.pos = [rng.uniform(0, maze.width * tile - 1), rng.uniform(0, maze.height * tile - 1)]
+        store.add_enemy(enemy)
+    # snapped to whole tiles now and then, so some enemies sit exactly on a range boundary
+    for enemy in store.enemies[::5]:
+        enemy.pos[:] = (enemy.pos // tile) * tile
+    centers = [(x * tile + tile // 2, y * tile + tile // 2) for x in range(0, maze.width, 2) for y in range(0, maze.height, 3)]
+    radii = [rng.choice((3 * tile, 4.5 * tile)) for _ in centers]
+    base_center = (maze.base[0] * tile + tile // 2, maze.base[1] * tile + tile // 2)
+    targets = store.find_targets(centers, radii, base_center, maze.width, maze.height)
+    assert targets == [full_scan(store, center, radius, base_center) for center, radius in zip(centers, radii)]
@@ -0,0 +1,12 @@
+# text_cache.py
+import pygame
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def get_font(size):
+    return pygame.font.Font(None, size)
+
+@lru_cache(maxsize=256)
+def render_text(text, size, color):
+    """rendered text surface, shared between callers: blit it, never draw onto it"""
+    return get_font(size).render(text, True, color)
@@ -0,0 +1,43 @@
+# timestep.py
+import time
+from utils import Constants
+
+class FixedTimestep:
+    """turns elapsed real time into a count of fixed simulation ticks that are due
+
+    The main loop runs every due tick and then renders once, so under load it skips renders
+    instead of slowing the game down. A frame never runs more than max_ticks_per_frame ticks;
+    beyond that the backlog is dropped so a long stall (a hidden browser tab, a debugger) does
+    not turn into a burst of catch-up ticks.
+    """
+    def __init__(self, tick_seconds=1 / Constants.FPS, max_ticks_per_frame=5, clock=time.perf_counter):
+        self.tick_seconds = tick_seconds
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.clock = clock
+        self.previous = None
+        self.accumulator = 0.0
+        self.skipped_renders = 0  # ticks run without a render of their own
+        self.dropped_ticks = 0
+
+    def advance(self):
+        now = self.clock()
+        if self.previous is None:
+            self.previous = now
+            self.accumulator = self.tick_seconds  # run the first tick straight away
+        self.accumulator += now - self.previous
+        self.previous = now
+        due = int(self.accumulator / self.tick_seconds)
+        if due > self.max_ticks_per_frame:
+            self.dropped_ticks += due - self.max_ticks_per_frame
+            due = self.max_ticks_per_frame
+            self.accumulator = due * self.tick_seconds
+        self.accumulator -= due * self.tick_seconds
+        if due > 1:
+            self.skipped_renders += due - 1
+        return due
+
+    def time_to_next_tick(self):
+        """seconds the loop can sleep before another tick is due"""
+        if self.previous is None:
+            return 0.0
+        return max(0.0, self.tick_seconds - self.accumulator - (self.clock() - self.previous))
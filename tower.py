@@ -1,9 +1,12 @@
 # tower.py
 import math
 import pygame
+from text_cache import render_text
 from utils import Colors, Constants
 
 class Tower:
+    __slots__ = ('x', 'y', 'level', 'base_range', 'damage', 'fire_rate', 'last_shot')
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -11,7 +14,7 @@ class Tower:
         self.base_range = 3 * Constants.TILE_SIZE
         self.damage = 1
         self.fire_rate = 1
-        self.last_shot = 0
+        self.last_shot = 0  # tick of the latest shot
 
     def get_time_between_shots(self):
         return max(1.0, 6.0 - (self.level - 1) * 0.5)
@@ -20,61 +23,68 @@ class Tower:
         self.level += 1
         self.damage = self.level
 
-    def update(self, enemies, game, time):
-        if time - self.last_shot < self.get_time_between_shots() * 1000:
-            return None
-        target, min_dist = None, float('inf')
-        bx, by = game.maze.base
-        range_ = self.base_range * (1.5 if game.tower_boost_timer > 0 else 1)
+    def ready_tick(self):
+        """first tick the tower may fire again"""
+        return self.last_shot + math.ceil(self.get_time_between_shots() * Constants.FPS)
+
+    def center(self):
         half_tile_size = Constants.TILE_SIZE // 2
-        for e in enemies:
-            dist = math.hypot(e.pos[0] - (self.x * Constants.TILE_SIZE + half_tile_size),
-                              e.pos[1] - (self.y * Constants.TILE_SIZE + half_tile_size))
-            if dist <= range_:
-                base_dist = math.hypot(e.pos[0] - (bx * Constants.TILE_SIZE + half_tile_size),
-                              e.pos[1] - (by * Constants.TILE_SIZE + half_tile_size))
+        return (self.x * Constants.TILE_SIZE + half_tile_size, self.y * Constants.TILE_SIZE + half_tile_size)
+
+    def find_target(self, game, range_, base_center):
+        """the enemy within range_ closest to the base, or None; EntityStore.find_targets does this in bulk"""
+        target, min_dist = None, float('inf')
+        center_x, center_y = self.center()
+        for e in game.enemy_index.query_radius(center_x, center_y, range_):
+            if math.hypot(e.pos[0] - center_x, e.pos[1] - center_y) <= range_:
+                base_dist = math.hypot(e.pos[0] - base_center[0], e.pos[1] - base_center[1])
                 if base_dist < min_dist:
                     min_dist = base_dist
                     target = e
-        if target:
-            self.last_shot = time
-            return Projectile((self.x * Constants.TILE_SIZE + half_tile_size,
-                               self.y * Constants.TILE_SIZE + half_tile_size), target, self.damage)
-        return None
+        return target
 
-    def draw(self, screen, time, tower_boost_timer):
-        size = 28
-        offset = (Constants.TILE_SIZE - size) // 2
-        pygame.draw.rect(screen, Colors.PURPLE, (self.x * Constants.TILE_SIZE + offset, self.y * Constants.TILE_SIZE + offset, size, size))
-        pygame.draw.polygon(screen, Colors.GRAY, [(self.x * Constants.TILE_SIZE + offset + size / 2, self.y * Constants.TILE_SIZE + offset + size * 4 / 5),
-                                           (self.x * Constants.TILE_SIZE + offset + size / 5, self.y * Constants.TILE_SIZE + size),
-                                           (self.x * Constants.TILE_SIZE + offset + size * 4 / 5, self.y * Constants.TILE_SIZE + size)])
-        center_point = self.y * Constants.TILE_SIZE + Constants.TILE_SIZE // 2
+    def shoot(self, game, target, tick):
+        """fire at target; the caller checks the cooldown"""
+        self.last_shot = tick
+        return game.projectile_pool.acquire(self.center(), target, self.damage)
+
+    def background_sprites(self, atlas, boosted):
+        """the parts that only change on upgrade or boost, baked into the maze background"""
+        tile_x = self.x * Constants.TILE_SIZE
+        tile_y = self.y * Constants.TILE_SIZE
+        radius = self.base_range * (1.5 if boosted else 1)
+        return ((atlas.tower_body, (tile_x, tile_y)),
+                (atlas.range_ring(radius), (tile_x + 16 - int(radius), tile_y + 16 - int(radius))),
+                (render_text(str(self.level), 20, Colors.WHITE), (tile_x + 24, tile_y + 24)))
+
+    def sprites(self, atlas, time, tick):
+        tile_x = self.x * Constants.TILE_SIZE
+        tile_y = self.y * Constants.TILE_SIZE
         individual_offset = self.y * 100 + self.x
-        phase = math.sin(2 * math.pi * (time + individual_offset) / 1500)
-        hover_offset = phase * 4
-        gem_y = center_point + hover_offset
-        pygame.draw.polygon(screen, Colors.LIGHT_GRAY, [(self.x * Constants.TILE_SIZE + 16, gem_y - 5),
-                                                 (self.x * Constants.TILE_SIZE + 21, gem_y),
-                                                 (self.x * Constants.TILE_SIZE + 16, gem_y + 5),
-                                                 (self.x * Constants.TILE_SIZE + 11, gem_y)])
-        pygame.draw.circle(screen, color=Colors.LIGHT_GRAY, width=1,
-                           radius=self.base_range * (1.5 if tower_boost_timer > 0 else 1),
-                           center=(self.x * Constants.TILE_SIZE + 16, self.y * Constants.TILE_SIZE + 16))
-        level_text = pygame.font.Font(None, 20).render(str(self.level), True, Colors.WHITE)
-        screen.blit(level_text, (self.x * Constants.TILE_SIZE + 24, self.y * Constants.TILE_SIZE + 24))
-        ratio = min(1, (time - self.last_shot) / (self.get_time_between_shots() * 1000))
-        pygame.draw.rect(screen, Colors.BLUE, (self.x * Constants.TILE_SIZE + 4, self.y * Constants.TILE_SIZE + 28, int(24 * ratio), 4))
+        hover_offset = math.sin(2 * math.pi * (time + individual_offset) / 1500) * 4
+        gem, (gem_x, gem_y) = atlas.gem(hover_offset)
+        ratio = min(1, (tick - self.last_shot) / (self.get_time_between_shots() * Constants.FPS))
+        return ((gem, (tile_x + gem_x, tile_y + gem_y)),
+                (atlas.cooldown_bar(ratio), (tile_x + 4, tile_y + 28)))
 
 class Projectile:
+    __slots__ = ('pos', 'enemy', 'enemy_generation', 'speed', 'damage', 'slot', 'generation')
+
     def __init__(self, start, enemy, damage):
-        self.pos = list(start)
+        self.pos = [0.0, 0.0]
+        self.generation = 0
+        self.reset(start, enemy, damage)
+
+    def reset(self, start, enemy, damage):
+        self.pos[0], self.pos[1] = start
         self.enemy = enemy
+        self.enemy_generation = enemy.generation  # differs from enemy.generation once the target has died
         self.speed = 5 * Constants.TILE_SIZE / Constants.FPS
         self.damage = damage
+        self.slot = -1  # index in Game.projectiles
 
     def update(self, enemies, game):
-        if self.enemy not in enemies:
+        if self.enemy.generation != self.enemy_generation:
             return True
         dx = self.enemy.pos[0] - self.pos[0]
         dy = self.enemy.pos[1] - self.pos[1]
@@ -82,7 +92,7 @@ class Projectile:
         if dist < self.speed:
             self.enemy.hit_points -= self.damage
             if self.enemy.hit_points <= 0:
-                enemies.remove(self.enemy)
+                game.remove_enemy(self.enemy)
                 game.destroyed_enemies += 1
                 game.score += 10
             return True
@@ -91,12 +101,16 @@ class Projectile:
         self.pos[1] += math.sin(angle) * self.speed
         return False
 
-    def draw(self, screen):
+    def draw(self, screen, offset=(0, 0)):
+        if self.enemy.generation != self.enemy_generation:
+            return pygame.Rect(int(self.pos[0] - offset[0]), int(self.pos[1] - offset[1]), 0, 0)
         dx = self.enemy.pos[0] - self.pos[0]
         dy = self.enemy.pos[1] - self.pos[1]
         dist = math.hypot(dx, dy)
+        x, y = self.pos[0] - offset[0], self.pos[1] - offset[1]
         if dist > 0:
             direction = (dx / dist, dy / dist)
-            end_pos = (self.pos[0] + direction[0] * 10, self.pos[1] + direction[1] * 10)
-            pygame.draw.line(screen, Colors.LIGHT_GRAY, (int(self.pos[0]), int(self.pos[1])),
-                             (int(end_pos[0]), int(end_pos[1])), 2)
+            end_pos = (x + direction[0] * 10, y + direction[1] * 10)
+            return pygame.draw.line(screen, Colors.LIGHT_GRAY, (int(x), int(y)),
+                                    (int(end_pos[0]), int(end_pos[1])), 2)
+        return pygame.Rect(int(x), int(y), 0, 0)
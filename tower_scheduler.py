@@ -0,0 +1,78 @@
+# tower_scheduler.py
+from heapq import heappop, heappush
+from utils import Constants
+
+class TowerScheduler:
+    """towers queued by the tick their cooldown ends, woken only once ready and with an enemy on a tile they cover
+
+    A tower that wakes and finds nothing in exact range stays ready and is woken again on the next tick an
+    enemy stands on one of its tiles. Towers come back in build order, the order Game used to poll them in.
+    """
+    BOOST = 1.5  # range multiplier while the tower boost powerup runs
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.heap = []  # (ready tick, build order, tower)
+        self.ready_at = {}  # tower -> ready tick of its live heap entry; older entries are skipped
+        self.order = {}  # tower -> build order
+        self.ready = set()  # cooled-down towers waiting for an enemy in range
+        self.coverage = ({}, {})  # tile index -> towers reaching that tile, at normal and boosted range
+
+    def add(self, tower):
+        self.order[tower] = len(self.order)
+        self.cover(tower)
+        self.schedule(tower)
+
+    def cover(self, tower):
+        for boosted, coverage in enumerate(self.coverage):
+            for tile in self.covered_tiles(tower, tower.base_range * (self.BOOST if boosted else 1)):
+                coverage.setdefault(tile, []).append(tower)
+
+    def covered_tiles(self, tower, radius):
+        """indices of the tiles overlapping the tower's range circle, as TileIndex.query_radius picks them"""
+        tile = Constants.TILE_SIZE
+        x = tower.x * tile + tile // 2
+        y = tower.y * tile + tile // 2
+        radius_sq = radius * radius
+        tiles = []
+        for ty in range(max(int(y - radius) // tile, 0), min(int(y + radius) // tile, self.height - 1) + 1):
+            dy = max(ty * tile - y, 0, y - (ty + 1) * tile)
+            for tx in range(max(int(x - radius) // tile, 0), min(int(x + radius) // tile, self.width - 1) + 1):
+                dx = max(tx * tile - x, 0, x - (tx + 1) * tile)
+                if dx * dx + dy * dy <= radius_sq:
+                    tiles.append(ty * self.width + tx)
+        return tiles
+
+    def schedule(self, tower):
+        ready_tick = tower.ready_tick()
+        self.ready_at[tower] = ready_tick
+        heappush(self.heap, (ready_tick, self.order[tower], tower))
+
+    def upgraded(self, tower):
+        # a higher level shortens the cooldown, so the queued ready tick may now be too late
+        self.ready.discard(tower)
+        self.schedule(tower)
+
+    def fired(self, tower):
+        self.ready.discard(tower)
+        self.schedule(tower)
+
+    def advance(self, tick):
+        """move the towers whose cooldown has ended by tick to the ready set; returns whether any are ready"""
+        heap, ready_at = self.heap, self.ready_at
+        while heap and heap[0][0] <= tick:
+            ready_tick, _, tower = heappop(heap)
+            if ready_at[tower] == ready_tick:
+                self.ready.add(tower)
+        return bool(self.ready)
+
+    def woken(self, occupied_tiles, boosted):
+        """ready towers covering any of the occupied tile indices, in build order"""
+        coverage, ready = self.coverage[boosted], self.ready
+        woken = set()
+        for tile in occupied_tiles:
+            for tower in coverage.get(tile, ()):
+                if tower in ready:
+                    woken.add(tower)
+        return sorted(woken, key=self.order.__getitem__)
@@ -1,4 +1,7 @@
 # utils.py
+from array import array
+from collections import OrderedDict, deque
+from heapq import heappop, heappush
 
 # Constants
 class Constants:
@@ -7,6 +10,7 @@ class Constants:
     FPS = 30
     SCREEN_WIDTH = 800
     SCREEN_HEIGHT = 600
+    PATH_BUDGET_US = 2000  # per-tick pathfinding budget of the interactive game
 
 # Colors
 class Colors:
@@ -25,36 +29,142 @@ class Colors:
     LIGHT_BLUE = (128, 192, 255)
     DARK_RED = (160, 0, 0)
 
+# Passages out of a maze cell, stored as a 4-bit mask per cell
+class Directions:
+    """direction bits for the compact maze grid"""
+    N = 1
+    E = 2
+    S = 4
+    W = 8
+    # (bit, dx, dy, opposite bit)
+    STEPS = ((W, -1, 0, E), (E, 1, 0, W), (N, 0, -1, S), (S, 0, 1, N))
+
 def heuristic(a, b):
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
 
-def a_star(start, goal, grid):
-    open_set = {start}
-    came_from = {}
-    g_score = {start: 0}
-    f_score = {start: heuristic(start, goal)}
+def a_star(start, goal, maze):
+    """shortest path over the maze's cell masks, as a list of (x, y) from start to goal"""
+    width, cells = maze.width, maze.cells
+    steps = [(bit, dx, dy, dy * width + dx) for bit, dx, dy, _ in Directions.STEPS]
+    goal_x, goal_y = goal
+    start_index = start[1] * width + start[0]
+    goal_index = goal_y * width + goal_x
+    g_score = [-1] * len(cells)
+    came_from = [-1] * len(cells)
+    g_score[start_index] = 0
+    open_heap = [(heuristic(start, goal), 0, start_index)]
 
-    while open_set:
-        current = min(open_set, key=lambda pos: f_score[pos])
-        if current == goal:
+    while open_heap:
+        _, g, current = heappop(open_heap)
+        if current == goal_index:
             path = []
-            while current in came_from:
-                path.append(current)
+            while current != start_index:
+                path.append((current % width, current // width))
                 current = came_from[current]
             path.append(start)
             return path[::-1]
+        if g > g_score[current]:
+            continue  # stale heap entry
 
-        open_set.remove(current)
-        x, y = current
-        for dx, dy, dir_ in [(-1, 0, 'W'), (1, 0, 'E'), (0, -1, 'N'), (0, 1, 'S')]:
-            nx, ny = x + dx, y + dy
-            if (0 <= nx < len(grid[0]) and 0 <= ny < len(grid) and 
-                dir_ in grid[y][x]):
-                neighbor = (nx, ny)
-                tentative_g_score = g_score[current] + 1
-                if tentative_g_score < g_score.get(neighbor, float('inf')):
+        mask = cells[current]
+        y, x = divmod(current, width)
+        g += 1
+        for bit, dx, dy, offset in steps:
+            if mask & bit:  # passages never lead off the grid
+                neighbor = current + offset
+                neighbor_g = g_score[neighbor]
+                if neighbor_g < 0 or g < neighbor_g:
                     came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g_score
-                    f_score[neighbor] = g_score[neighbor] + heuristic(neighbor, goal)
-                    open_set.add(neighbor)
+                    g_score[neighbor] = g
+                    heappush(open_heap, (g + abs(x + dx - goal_x) + abs(y + dy - goal_y), g, neighbor))
     return []
+
+
+class PathCache:
+    """bounded LRU of corridor-graph paths keyed by (start, goal), cleared whenever the maze grid changes"""
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.paths = OrderedDict()
+        self.grid_version = None
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, start, goal, maze):
+        """the cached path, or None after counting a miss"""
+        if maze.grid_version != self.grid_version:
+            self.invalidate()
+            self.grid_version = maze.grid_version
+        key = (start, goal)
+        path = self.paths.get(key)
+        if path is not None:
+            self.paths.move_to_end(key)
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    def store(self, start, goal, path):
+        self.paths[(start, goal)] = path
+        if len(self.paths) > self.max_size:
+            self.paths.popitem(last=False)
+        return path
+
+    def invalidate(self):
+        self.paths.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.paths),
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+class FlowField:
+    """distance and next hop from every cell toward a single goal cell"""
+    def __init__(self, maze, goal):
+        self.width = maze.width
+        self.height = maze.height
+        self.goal = goal
+        self.distance = array('i', [-1]) * (self.width * self.height)
+        self.next_hop = array('i', [-1]) * (self.width * self.height)  # cell index, -1 when unreachable
+        self.build(maze.cells)
+
+    def build(self, cells):
+        # reverse BFS from the goal: a cell is expanded through the neighbours that can step into it
+        width, size = self.width, len(cells)
+        distance, next_hop = self.distance, self.next_hop
+        goal = self.goal[1] * width + self.goal[0]
+        distance[goal] = 0
+        queue = deque([goal])
+        E, W, S, N = Directions.E, Directions.W, Directions.S, Directions.N
+        popleft, append = queue.popleft, queue.append
+        while queue:
+            current = popleft()
+            x = current % width
+            step = distance[current] + 1
+            neighbor = current - 1
+            if x > 0 and cells[neighbor] & E and distance[neighbor] < 0:
+                distance[neighbor] = step
+                next_hop[neighbor] = current
+                append(neighbor)
+            neighbor = current + 1
+            if x < width - 1 and cells[neighbor] & W and distance[neighbor] < 0:
+                distance[neighbor] = step
+                next_hop[neighbor] = current
+                append(neighbor)
+            neighbor = current - width
+            if neighbor >= 0 and cells[neighbor] & S and distance[neighbor] < 0:
+                distance[neighbor] = step
+                next_hop[neighbor] = current
+                append(neighbor)
+            neighbor = current + width
+            if neighbor < size and cells[neighbor] & N and distance[neighbor] < 0:
+                distance[neighbor] = step
+                next_hop[neighbor] = current
+                append(neighbor)
+
+    def get_distance(self, pos):
+        return self.distance[pos[1] * self.width + pos[0]]
+
+    def get_next(self, pos):
+        index = self.next_hop[pos[1] * self.width + pos[0]]
+        return (index % self.width, index // self.width) if index >= 0 else None
@@ -0,0 +1,173 @@
+# vec_env.py
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import random
+import time
+import pygame
+from simulation import KeyState, Simulation
+from utils import Constants
+
+try:
+    import numpy as np
+except ImportError:  # only the training API needs numpy; the game itself runs without it
+    np = None
+
+DIRECTION_KEYS = (None, pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT)
+# action = direction index + len(DIRECTION_KEYS) * space held: 0 idle, 1-4 move, 5 build, 6-9 move and build
+ACTION_KEYS = tuple(KeyState([key for key in (direction, pygame.K_SPACE if space else None) if key])
+                    for space in (False, True) for direction in DIRECTION_KEYS)
+NUM_ACTIONS = len(ACTION_KEYS)
+
+class VecEnv:
+    """N independent headless games stepped in lockstep from a batch of actions, with batched numpy observations
+
+    Every game shares menu_params so the observation arrays have one shape. step(actions) returns
+    (observations, rewards, dones, infos): the reward is the change in score, and a game that ends
+    (its base falls, its last wave is cleared or it runs max_episode_ticks) is restarted on the next
+    seed of its env before the observations are filled, with the finished episode's totals in infos.
+    The observation arrays are filled in place and reused by the next step; copy them to keep them.
+
+    observations:
+        walls       (N, H, W) uint8    Directions mask of each tile, one-way walls included
+        occupancy   (N, H, W) uint8    Occupancy flags: spawn, base, pellet, powerup, tower
+        tower_level (N, H, W) uint8    level of the tower on each tile, 0 for none
+        player      (N, 2) float32     player centre in tiles
+        enemies     (N, max_enemies, 3) float32  x, y in tiles and hit points, zero padded
+        enemy_count (N,) int32         enemies alive, which may exceed max_enemies
+        resources, base_health, score, wave  (N,) int32
+    """
+    def __init__(self, num_envs, menu_params=None, seeds=None, ticks_per_step=1, max_episode_ticks=None,
+                 max_enemies=64, vectorized=False):
+        if np is None:
+            raise ImportError("VecEnv requires numpy")
+        self.num_envs = num_envs
+        self.menu_params = dict(menu_params or {})
+        self.ticks_per_step = ticks_per_step
+        self.max_episode_ticks = max_episode_ticks
+        self.max_enemies = max_enemies
+        self.vectorized = vectorized
+        self.seeds = list(seeds) if seeds is not None else [random.getrandbits(32) for _ in range(num_envs)]
+        if len(self.seeds) != num_envs:
+            raise ValueError(f"{len(self.seeds)} seeds for {num_envs} envs")
+        # each env's later episodes are seeded from a stream of its own, so a run is reproducible from seeds
+        self.seed_streams = [random.Random(seed) for seed in self.seeds]
+        self.sims = [None] * num_envs
+        self.episode_seeds = [None] * num_envs
+        self.episode_rewards = np.zeros(num_envs, dtype=np.int64)
+
+        width = self.menu_params.get('width', 20)
+        height = self.menu_params.get('height', 15)
+        self.observations = {
+            'walls': np.zeros((num_envs, height, width), dtype=np.uint8),
+            'occupancy': np.zeros((num_envs, height, width), dtype=np.uint8),
+            'tower_level': np.zeros((num_envs, height, width), dtype=np.uint8),
+            'player': np.zeros((num_envs, 2), dtype=np.float32),
+            'enemies': np.zeros((num_envs, max_enemies, 3), dtype=np.float32),
+            'enemy_count': np.zeros(num_envs, dtype=np.int32),
+            'resources': np.zeros(num_envs, dtype=np.int32),
+            'base_health': np.zeros(num_envs, dtype=np.int32),
+            'score': np.zeros(num_envs, dtype=np.int32),
+            'wave': np.zeros(num_envs, dtype=np.int32),
+        }
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.dones = np.zeros(num_envs, dtype=bool)
+
+    def reset(self):
+        """start a fresh game in every env, the first on each env's own seed; returns the observations"""
+        self.seed_streams = [random.Random(seed) for seed in self.seeds]
+        for index, seed in enumerate(self.seeds):
+            self.reset_env(index, seed)
+        return self.observations
+
+    def reset_env(self, index, seed):
+        sim = Simulation(self.menu_params, vectorized=self.vectorized, seed=seed)
+        self.sims[index] = sim
+        self.episode_seeds[index] = seed
+        self.episode_rewards[index] = 0
+        maze = sim.game.maze
+        self.observations['walls'][index] = np.frombuffer(maze.cells, dtype=np.uint8).reshape(maze.height, maze.width)
+        self.observations['tower_level'][index] = 0
+        self.observe(index)
+
+    def step(self, actions):
+        """advance every env by ticks_per_step ticks with actions[i] held in env i"""
+        rewards, dones = self.rewards, self.dones
+        infos = [None] * self.num_envs
+        for index, (sim, action) in enumerate(zip(self.sims, actions)):
+            keys = ACTION_KEYS[action]
+            game = sim.game
+            score = game.score
+            for _ in range(self.ticks_per_step):
+                if not sim.step(keys):
+                    break
+            reward = game.score - score
+            rewards[index] = reward
+            self.episode_rewards[index] += reward
+            done = sim.finished or (self.max_episode_ticks is not None and sim.ticks >= self.max_episode_ticks)
+            dones[index] = done
+            if done:
+                infos[index] = {'seed': self.episode_seeds[index], 'ticks': sim.ticks, 'score': game.score,
+                                'episode_reward': int(self.episode_rewards[index]), 'base_health': game.base_health,
+                                'waves_survived': game.wave_number - 1, 'towers_built': len(game.towers)}
+                self.reset_env(index, self.seed_streams[index].getrandbits(32))
+            else:
+                self.observe(index)
+        return self.observations, rewards, dones, infos
+
+    def observe(self, index):
+        game = self.sims[index].game
+        obs = self.observations
+        occupancy = game.maze.occupancy
+        obs['occupancy'][index] = np.frombuffer(occupancy.flags, dtype=np.uint8).reshape(occupancy.height, occupancy.width)
+        levels = obs['tower_level'][index]
+        for tower in game.towers:
+            levels[tower.y, tower.x] = tower.level
+        tile = Constants.TILE_SIZE
+        player = game.player
+        obs['player'][index] = ((player.pos[0] + player.w / 2) / tile, (player.pos[1] + player.h / 2) / tile)
+
+        enemies = obs['enemies'][index]
+        count = len(game.enemies)
+        shown = min(count, self.max_enemies)
+        if game.entity_store:
+            enemies[:shown, :2] = game.entity_store.enemy_pos[:shown] / tile
+            enemies[:shown, 2] = game.entity_store.enemy_hp[:shown]
+        else:
+            for row, enemy in zip(enemies, game.enemies[:shown]):
+                row[0] = enemy.pos[0] / tile
+                row[1] = enemy.pos[1] / tile
+                row[2] = enemy.hit_points
+        enemies[shown:] = 0
+        obs['enemy_count'][index] = count
+        obs['resources'][index] = player.resources
+        obs['base_health'][index] = game.base_health
+        obs['score'][index] = game.score
+        obs['wave'][index] = game.wave_number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure VecEnv throughput with random actions")
+    parser.add_argument('--envs', type=int, default=16)
+    parser.add_argument('--steps', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--width', type=int, default=20)
+    parser.add_argument('--height', type=int, default=15)
+    parser.add_argument('--ticks-per-step', type=int, default=1)
+    args = parser.parse_args()
+
+    env = VecEnv(args.envs, {'width': args.width, 'height': args.height},
+                 seeds=range(args.seed, args.seed + args.envs), ticks_per_step=args.ticks_per_step)
+    env.reset()
+    rng = np.random.default_rng(args.seed)
+    episodes = 0
+    started = time.perf_counter()
+    for _ in range(args.steps):
+        _, _, dones, _ = env.step(rng.integers(NUM_ACTIONS, size=args.envs))
+        episodes += int(dones.sum())
+    elapsed = time.perf_counter() - started
+    print(f"{args.envs * args.steps / elapsed:.0f} env-steps/s over {args.envs} envs, {episodes} episodes finished")
+
+if __name__ == "__main__":
+    main()
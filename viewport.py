@@ -0,0 +1,155 @@
+# viewport.py
+from collections import OrderedDict
+import pygame
+from occupancy import Occupancy
+from utils import Colors, Constants
+
+def draw_one_way_wall(screen, wall_type, x, y, direction, tile_size=Constants.TILE_SIZE):
+    if wall_type == 'vertical':
+        px = (x + 1) * tile_size
+        py_top = y * tile_size
+        py_bottom = (y + 1) * tile_size
+        py_mid = (py_top + py_bottom) / 2
+        if direction == 'east':
+            pygame.draw.line(screen, Colors.DARK_GRAY, (px - 2, py_top), (px + 2, py_mid), 2)
+            pygame.draw.line(screen, Colors.LIGHT_GRAY, (px - 2, py_bottom), (px + 2, py_mid), 2)
+        else:  # 'west'
+            pygame.draw.line(screen, Colors.LIGHT_GRAY, (px + 2, py_top), (px - 2, py_mid), 2)
+            pygame.draw.line(screen, Colors.DARK_GRAY, (px + 2, py_bottom), (px - 2, py_mid), 2)
+    elif wall_type == 'horizontal':
+        py = (y + 1) * tile_size
+        px_left = x * tile_size
+        px_right = (x + 1) * tile_size
+        px_mid = (px_left + px_right) / 2
+        if direction == 'south':
+            pygame.draw.line(screen, Colors.DARK_GRAY, (px_left, py - 2), (px_mid, py + 2), 2)
+            pygame.draw.line(screen, Colors.LIGHT_GRAY, (px_right, py - 2), (px_mid, py + 2), 2)
+        else:  # 'north'
+            pygame.draw.line(screen, Colors.LIGHT_GRAY, (px_left, py + 2), (px_mid, py - 2), 2)
+            pygame.draw.line(screen, Colors.DARK_GRAY, (px_right, py + 2), (px_mid, py - 2), 2)
+
+
+class Camera:
+    """the part of the maze shown in the window, kept centred on the player and clamped to the maze"""
+    def __init__(self, maze, width, height):
+        self.maze = maze
+        self.width = width
+        self.height = height
+        self.x = 0
+        self.y = 0
+        self.covers_maze = maze.width * Constants.TILE_SIZE <= width and maze.height * Constants.TILE_SIZE <= height
+
+    def follow(self, pos):
+        """centre on pos in maze pixels; returns whether the view moved"""
+        max_x = max(self.maze.width * Constants.TILE_SIZE - self.width, 0)
+        max_y = max(self.maze.height * Constants.TILE_SIZE - self.height, 0)
+        x = min(max(int(pos[0]) - self.width // 2, 0), max_x)
+        y = min(max(int(pos[1]) - self.height // 2, 0), max_y)
+        moved = (x, y) != (self.x, self.y)
+        self.x, self.y = x, y
+        return moved
+
+    def tile_range(self, margin=0):
+        """inclusive (min_x, min_y, max_x, max_y) of the tiles in view, widened by margin tiles"""
+        tile = Constants.TILE_SIZE
+        return (max(self.x // tile - margin, 0),
+                max(self.y // tile - margin, 0),
+                min((self.x + self.width - 1) // tile + margin, self.maze.width - 1),
+                min((self.y + self.height - 1) // tile + margin, self.maze.height - 1))
+
+    def contains(self, pos, margin=0):
+        return self.x - margin <= pos[0] < self.x + self.width + margin and \
+            self.y - margin <= pos[1] < self.y + self.height + margin
+
+    def to_screen(self, blit_sequence):
+        return [(surface, (pos[0] - self.x, pos[1] - self.y)) for surface, pos in blit_sequence]
+
+
+class MazeChunks:
+    """the maze background rendered in square chunks on demand, so drawing cost follows the window size"""
+    CHUNK_TILES = 16
+    RING_TILES = 5  # boosted range rings reach 4.5 tiles past their tower
+
+    def __init__(self, maze, atlas, max_chunks=64):
+        self.maze = maze
+        self.atlas = atlas
+        self.max_chunks = max_chunks
+        self.size = self.CHUNK_TILES * Constants.TILE_SIZE
+        self.static_chunks = OrderedDict()  # (cx, cy) -> walls, spawns and base
+        # (cx, cy) -> ((items_version, towers_version, boosted), static chunk with items and tower art on top)
+        self.item_chunks = OrderedDict()
+
+    def chunk_tiles(self, cx, cy):
+        min_x, min_y = cx * self.CHUNK_TILES, cy * self.CHUNK_TILES
+        return (min_x, min_y, min(min_x + self.CHUNK_TILES, self.maze.width) - 1,
+                min(min_y + self.CHUNK_TILES, self.maze.height) - 1)
+
+    def render_static(self, cx, cy):
+        maze = self.maze
+        min_x, min_y, max_x, max_y = self.chunk_tiles(cx, cy)
+        origin_x, origin_y = cx * self.size, cy * self.size
+        layer = pygame.Surface((self.size, self.size))
+        layer.fill(Colors.BLACK)
+        for wall in maze.generate_wall_rects(min_x, min_y, max_x, max_y):
+            pygame.draw.rect(layer, Colors.WHITE, wall.move(-origin_x, -origin_y))
+        for wall_type, x, y, direction in maze.get_one_way_walls(min_x, min_y, max_x, max_y):
+            draw_one_way_wall(layer, wall_type, x - min_x, y - min_y, direction)
+        for spawn in maze.spawn_points:
+            if min_x <= spawn[0] <= max_x and min_y <= spawn[1] <= max_y:
+                pygame.draw.rect(layer, Colors.DARK_RED, ((spawn[0] - min_x) * Constants.TILE_SIZE + 1, (spawn[1] - min_y) * Constants.TILE_SIZE + 1, Constants.TILE_SIZE - 2, Constants.TILE_SIZE - 2))
+        if min_x <= maze.base[0] <= max_x and min_y <= maze.base[1] <= max_y:
+            pygame.draw.rect(layer, Colors.LIGHT_BLUE, ((maze.base[0] - min_x) * Constants.TILE_SIZE, (maze.base[1] - min_y) * Constants.TILE_SIZE, Constants.TILE_SIZE - 2, Constants.TILE_SIZE - 2))
+        return layer
+
+    def render_items(self, cx, cy, static, boosted):
+        # pellets, powerups and the still parts of towers sit on top of the static chunk and only change on
+        # pickup, regen, building, upgrades and boosts
+        layer = static.copy()
+        min_x, min_y, max_x, max_y = self.chunk_tiles(cx, cy)
+        flags, width = self.maze.occupancy.flags, self.maze.width
+        half_tile_size = Constants.TILE_SIZE // 2
+        for y in range(min_y, max_y + 1):
+            row = y * width
+            for x in range(min_x, max_x + 1):
+                flag = flags[row + x]
+                if flag & Occupancy.PELLET:
+                    pygame.draw.rect(layer, Colors.YELLOW, ((x - min_x) * Constants.TILE_SIZE + 14, (y - min_y) * Constants.TILE_SIZE + 14, 4, 4))
+                if flag & Occupancy.POWERUP:
+                    pygame.draw.circle(layer, Colors.PURPLE, ((x - min_x) * Constants.TILE_SIZE + half_tile_size, (y - min_y) * Constants.TILE_SIZE + half_tile_size), 5)
+        origin_x, origin_y = cx * self.size, cy * self.size
+        margin = self.RING_TILES
+        towers = self.maze.occupancy.towers_in(max(min_x - margin, 0), max(min_y - margin, 0),
+                                               min(max_x + margin, self.maze.width - 1),
+                                               min(max_y + margin, self.maze.height - 1))
+        layer.blits([(surface, (x - origin_x, y - origin_y)) for tower in towers
+                     for surface, (x, y) in tower.background_sprites(self.atlas, boosted)], doreturn=False)
+        return layer
+
+    def cached(self, cache, key, build):
+        value = cache.get(key)
+        if value is None:
+            value = build()
+            cache[key] = value
+            if len(cache) > self.max_chunks:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return value
+
+    def chunk(self, cx, cy, towers_version, boosted):
+        static = self.cached(self.static_chunks, (cx, cy), lambda: self.render_static(cx, cy))
+        version = (self.maze.items_version, towers_version, boosted)
+        entry = self.item_chunks.get((cx, cy))
+        if entry is None or entry[0] != version:
+            self.item_chunks.pop((cx, cy), None)
+        entry = self.cached(self.item_chunks, (cx, cy), lambda: (version, self.render_items(cx, cy, static, boosted)))
+        return entry[1]
+
+    def draw(self, surface, camera, towers_version, boosted):
+        """paint the chunks under the camera onto surface, which is the size of the view"""
+        surface.fill(Colors.BLACK)
+        max_cx = (self.maze.width - 1) // self.CHUNK_TILES
+        max_cy = (self.maze.height - 1) // self.CHUNK_TILES
+        for cy in range(camera.y // self.size, min((camera.y + camera.height - 1) // self.size, max_cy) + 1):
+            for cx in range(camera.x // self.size, min((camera.x + camera.width - 1) // self.size, max_cx) + 1):
+                surface.blit(self.chunk(cx, cy, towers_version, boosted), (cx * self.size - camera.x, cy * self.size - camera.y))